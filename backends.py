@@ -0,0 +1,454 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from rfm import score_rfm
+from star_join import build_master
+
+
+# Execution backends for the transaction stages of the cleaning pipeline:
+# dedup, date parsing, features + bucketing, the customer / product / store
+# metrics, the master join, RFM and cohorts. The pandas backend is the
+# reference; the Polars backend runs each stage as one lazy query on the
+# streaming engine, the DuckDB backend as one SQL statement. Every backend
+# takes and returns pandas frames, so the rest of the pipeline does not change.
+# Polars and DuckDB are only imported when their backend is used.
+#
+# Rounding follows numpy (scale, round half to even, unscale). Float sums may
+# be accumulated in a different order by each engine, so parity is exact for
+# everything except float aggregates, which are compared with a relative
+# tolerance.
+PARITY_RTOL = 1e-9
+
+TRANSACTION_FEATURES = ['year', 'month', 'month_name', 'quarter', 'day_of_week', 'day_name', 'week_of_year',
+                        'is_weekend', 'season', 'profit_margin_pct', 'discount_given', 'revenue_per_unit',
+                        'transaction_size']
+# dtypes the pandas reference produces for the feature columns
+FEATURE_DTYPES = {'year': 'int32', 'month': 'int32', 'quarter': 'int32', 'day_of_week': 'int32',
+                  'week_of_year': 'UInt32', 'is_weekend': 'int64', 'discount_given': 'int64'}
+
+MASTER_COLUMNS = {
+    'products': ('product_id', ['product_name', 'category', 'margin_category']),
+    'stores': ('store_id', ['store_name', 'region', 'city']),
+    'customers': ('customer_id', ['customer_segment', 'lifetime_value']),
+}
+
+
+def _conform_transactions(result, raw):
+    # raw columns keep their position, features follow in pandas order
+    columns = list(raw.columns) + [col for col in TRANSACTION_FEATURES if col not in raw.columns]
+    result = result[columns]
+    return result.astype({col: dtype for col, dtype in FEATURE_DTYPES.items() if col in result})
+
+
+def _cohort_tables(long):
+    # long: one row per (cohort, period_number) with its customer count, periods as month ordinals
+    counts = (long.pivot(index='cohort', columns='period_number', values='customers')
+              .sort_index()
+              .reindex(columns=pd.RangeIndex(long['period_number'].max() + 1), fill_value=0)
+              .fillna(0).astype('int64'))
+    counts.index = pd.PeriodIndex.from_ordinals(counts.index.to_numpy(dtype=np.int64), freq='M')
+    counts.index.name = 'cohort'
+    counts.columns.name = 'period_number'
+    return counts, (counts.div(counts[0], axis=0) * 100).round(2)
+
+
+class PandasBackend:
+    name = 'pandas'
+
+    def dedup(self, df_transactions):
+        import data_cleaning_pipeline as pipeline
+        return pipeline.clean_transactions(df_transactions)
+
+    def convert_types(self, df_transactions):
+        import data_cleaning_pipeline as pipeline
+        return pipeline.convert_types(df_transactions)[0]
+
+    def transaction_features(self, df_transactions):
+        import data_cleaning_pipeline as pipeline
+        return pipeline.add_transaction_features(df_transactions)
+
+    def customer_features(self, df_customers, df_transactions):
+        import data_cleaning_pipeline as pipeline
+        return pipeline.add_customer_features(df_customers, df_transactions)
+
+    def product_features(self, df_products, df_transactions):
+        import data_cleaning_pipeline as pipeline
+        return pipeline.add_product_features(df_products, df_transactions)
+
+    def store_features(self, df_stores, df_transactions):
+        import data_cleaning_pipeline as pipeline
+        return pipeline.add_store_features(df_stores, df_transactions)
+
+    def master(self, df_transactions, df_products, df_stores, df_customers):
+        return build_master(df_transactions, df_products, df_stores, df_customers)
+
+    def rfm(self, df_transactions):
+        from rfm import compute_rfm
+        return compute_rfm(df_transactions)
+
+    def cohorts(self, df_transactions):
+        from cohorts import cohort_retention
+        return cohort_retention(df_transactions)
+
+
+class PolarsBackend:
+    name = 'polars'
+
+    def __init__(self):
+        import polars as pl
+        self.pl = pl
+
+    def _lazy(self, df):
+        return self.pl.from_pandas(df).lazy()
+
+    def _collect(self, query):
+        return query.collect(engine='streaming').to_pandas()
+
+    def dedup(self, df_transactions):
+        pl = self.pl
+        query = (self._lazy(df_transactions)
+                 .with_columns(pl.col('discount_pct').fill_null(0), pl.col('discount_amount').fill_null(0))
+                 .unique(subset='transaction_id', keep='first', maintain_order=True))
+        result = self._collect(query)
+        return result, len(df_transactions) - len(result)
+
+    def convert_types(self, df_transactions):
+        pl = self.pl
+        query = self._lazy(df_transactions)
+        if query.collect_schema()['transaction_date'] != pl.String:
+            return df_transactions
+        return self._collect(query.with_columns(pl.col('transaction_date').str.to_datetime(time_unit='us')))
+
+    def transaction_features(self, df_transactions):
+        pl = self.pl
+        date = pl.col('transaction_date')
+        amount = pl.col('total_amount')
+        query = self._lazy(df_transactions).with_columns(
+            date.dt.year().alias('year'),
+            date.dt.month().alias('month'),
+            date.dt.strftime('%B').alias('month_name'),
+            date.dt.quarter().alias('quarter'),
+            (date.dt.weekday() - 1).alias('day_of_week'),
+            date.dt.strftime('%A').alias('day_name'),
+            date.dt.week().alias('week_of_year'),
+        ).with_columns(
+            pl.col('day_of_week').is_in([5, 6]).cast(pl.Int64).alias('is_weekend'),
+            pl.when(pl.col('month').is_in([12, 1, 2])).then(pl.lit('Winter'))
+              .when(pl.col('month').is_in([3, 4, 5])).then(pl.lit('Spring'))
+              .when(pl.col('month').is_in([6, 7, 8])).then(pl.lit('Summer'))
+              .otherwise(pl.lit('Fall')).alias('season'),
+            (pl.col('profit') / amount * 100).round(2, mode='half_to_even').alias('profit_margin_pct'),
+            (pl.col('discount_pct') > 0).cast(pl.Int64).alias('discount_given'),
+            (amount / pl.col('quantity')).round(2, mode='half_to_even').alias('revenue_per_unit'),
+            pl.when(amount < 50).then(pl.lit('Small'))
+              .when(amount < 200).then(pl.lit('Medium'))
+              .when(amount < 500).then(pl.lit('Large'))
+              .otherwise(pl.lit('Very Large')).alias('transaction_size'),
+        )
+        return _conform_transactions(self._collect(query), df_transactions)
+
+    def _metrics(self, df_dim, key, df_transactions, aggs, derived):
+        metrics = (self._lazy(df_transactions).group_by(key).agg(aggs).with_columns(derived))
+        query = self._lazy(df_dim).join(metrics, on=key, how='left', maintain_order='left')
+        return self._collect(query)
+
+    def customer_features(self, df_customers, df_transactions):
+        pl = self.pl
+        return self._metrics(
+            df_customers, 'customer_id', df_transactions[['customer_id', 'total_amount', 'transaction_id',
+                                                          'transaction_date']],
+            [pl.col('total_amount').sum().alias('lifetime_value'),
+             pl.col('transaction_id').count().cast(pl.Int64).alias('transaction_count'),
+             (pl.col('transaction_date').max() - pl.col('transaction_date').min()).dt.total_days()
+               .alias('customer_tenure_days')],
+            [(pl.col('lifetime_value') / pl.col('transaction_count')).alias('avg_order_value')])
+
+    def product_features(self, df_products, df_transactions):
+        pl = self.pl
+        result = self._metrics(
+            df_products, 'product_id', df_transactions[['product_id', 'quantity', 'total_amount', 'profit',
+                                                        'transaction_id']],
+            [pl.col('quantity').sum().alias('total_units_sold'),
+             pl.col('total_amount').sum().alias('total_revenue'),
+             pl.col('profit').sum().alias('total_profit'),
+             pl.col('transaction_id').count().cast(pl.Int64).alias('num_sales')],
+            [(pl.col('total_profit') / pl.col('num_sales')).alias('avg_profit_per_sale')])
+        # per-product columns are tiny, so the margin bucketing runs as a second lazy pass
+        margin = ((pl.col('unit_price') - pl.col('unit_cost')) / pl.col('unit_price') * 100)
+        query = self._lazy(result).with_columns(margin.round(2, mode='half_to_even').alias('margin_pct'))
+        query = query.with_columns(
+            pl.when(pl.col('margin_pct') < 30).then(pl.lit('Low Margin'))
+              .when(pl.col('margin_pct') < 50).then(pl.lit('Medium Margin'))
+              .otherwise(pl.lit('High Margin')).alias('margin_category'))
+        return self._collect(query)
+
+    def store_features(self, df_stores, df_transactions):
+        pl = self.pl
+        return self._metrics(
+            df_stores, 'store_id', df_transactions[['store_id', 'total_amount', 'profit', 'transaction_id',
+                                                    'customer_id']],
+            [pl.col('total_amount').sum().alias('total_revenue'),
+             pl.col('profit').sum().alias('total_profit'),
+             pl.col('transaction_id').count().cast(pl.Int64).alias('num_transactions'),
+             pl.col('customer_id').n_unique().cast(pl.Int64).alias('unique_customers')],
+            [(pl.col('total_revenue') / pl.col('num_transactions')).alias('revenue_per_transaction'),
+             (pl.col('total_revenue') / pl.col('unique_customers')).alias('revenue_per_customer')])
+
+    def master(self, df_transactions, df_products, df_stores, df_customers):
+        dims = {'products': df_products, 'stores': df_stores, 'customers': df_customers}
+        query = self._lazy(df_transactions)
+        for name, (key, columns) in MASTER_COLUMNS.items():
+            query = query.join(self._lazy(dims[name][[key] + columns]), on=key, how='left', maintain_order='left')
+        return self._collect(query)
+
+    def rfm(self, df_transactions):
+        pl = self.pl
+        date = pl.col('transaction_date')
+        query = (self._lazy(df_transactions[['customer_id', 'transaction_date', 'total_amount']])
+                 .with_columns((date.max() + pl.duration(days=1)).alias('analysis_date'))
+                 .group_by('customer_id')
+                 .agg((pl.col('analysis_date').first() - date.max()).dt.total_days().alias('recency'),
+                      date.count().cast(pl.Int64).alias('frequency'),
+                      pl.col('total_amount').sum().alias('monetary'))
+                 .sort('customer_id'))
+        return score_rfm(self._collect(query))
+
+    def cohorts(self, df_transactions):
+        pl = self.pl
+        date = pl.col('transaction_date')
+        pairs = (self._lazy(df_transactions[['customer_id', 'transaction_date']])
+                 .select('customer_id', ((date.dt.year() - 1970) * 12 + date.dt.month() - 1)
+                         .cast(pl.Int64).alias('period'))
+                 .unique())
+        first = pairs.group_by('customer_id').agg(pl.col('period').min().alias('cohort'))
+        query = (pairs.join(first, on='customer_id')
+                 .group_by('cohort', (pl.col('period') - pl.col('cohort')).alias('period_number'))
+                 .agg(pl.len().alias('customers')))
+        return _cohort_tables(self._collect(query))
+
+
+class DuckDBBackend:
+    name = 'duckdb'
+
+    def __init__(self):
+        import duckdb
+        self.con = duckdb.connect()
+
+    def _query(self, sql, **frames):
+        for name, frame in frames.items():
+            self.con.register(name, frame)
+        try:
+            result = self.con.sql(sql).df()
+        finally:
+            for name in frames:
+                self.con.unregister(name)
+        # nullable integers (e.g. counts after a left join) become float64 with NaN, as in pandas
+        for col in result.columns:
+            if isinstance(result[col].dtype, pd.Int64Dtype):
+                result[col] = result[col].astype('float64' if result[col].hasnans else 'int64')
+        return result
+
+    @staticmethod
+    def _with_row(df):
+        # replacement scans have no stable row order, so left-table order is carried explicitly
+        return df.assign(_row=np.arange(len(df)))
+
+    def dedup(self, df_transactions):
+        sql = '''
+            SELECT * EXCLUDE (_row) REPLACE (coalesce(discount_pct, 0) AS discount_pct,
+                                             coalesce(discount_amount, 0) AS discount_amount)
+            FROM transactions
+            QUALIFY row_number() OVER (PARTITION BY transaction_id ORDER BY _row) = 1
+            ORDER BY _row
+        '''
+        result = self._query(sql, transactions=self._with_row(df_transactions))
+        return result, len(df_transactions) - len(result)
+
+    def convert_types(self, df_transactions):
+        if not pd.api.types.is_string_dtype(df_transactions['transaction_date']):
+            return df_transactions
+        sql = '''
+            SELECT * EXCLUDE (_row) REPLACE (CAST(transaction_date AS TIMESTAMP) AS transaction_date)
+            FROM transactions ORDER BY _row
+        '''
+        return self._query(sql, transactions=self._with_row(df_transactions))
+
+    def transaction_features(self, df_transactions):
+        d = 'transaction_date'
+        features = {
+            'year': f'CAST(year({d}) AS INTEGER)',
+            'month': f'CAST(month({d}) AS INTEGER)',
+            'month_name': f'monthname({d})',
+            'quarter': f'CAST(quarter({d}) AS INTEGER)',
+            'day_of_week': f'CAST(isodow({d}) - 1 AS INTEGER)',
+            'day_name': f'dayname({d})',
+            'week_of_year': f'CAST(weekofyear({d}) AS UINTEGER)',
+            'is_weekend': f'CAST(isodow({d}) IN (6, 7) AS BIGINT)',
+            'season': f"""CASE WHEN month({d}) IN (12, 1, 2) THEN 'Winter'
+                               WHEN month({d}) IN (3, 4, 5) THEN 'Spring'
+                               WHEN month({d}) IN (6, 7, 8) THEN 'Summer' ELSE 'Fall' END""",
+            'profit_margin_pct': 'round_even(profit / total_amount * 100 * 100, 0) / 100',
+            'discount_given': 'CAST(discount_pct > 0 AS BIGINT)',
+            'revenue_per_unit': 'round_even(total_amount / quantity * 100, 0) / 100',
+            'transaction_size': """CASE WHEN total_amount < 50 THEN 'Small'
+                                        WHEN total_amount < 200 THEN 'Medium'
+                                        WHEN total_amount < 500 THEN 'Large' ELSE 'Very Large' END""",
+        }
+        columns = [f'{features[col]} AS "{col}"' if col in features else f'"{col}"'
+                   for col in df_transactions.columns]
+        columns += [f'{expr} AS "{col}"' for col, expr in features.items() if col not in df_transactions]
+        sql = f'SELECT {", ".join(columns)} FROM transactions ORDER BY _row'
+        result = self._query(sql, transactions=self._with_row(df_transactions))
+        return _conform_transactions(result, df_transactions)
+
+    def _metrics(self, df_dim, key, df_transactions, aggs, derived):
+        sql = f'''
+            WITH metrics AS (SELECT {key}, {aggs} FROM transactions GROUP BY {key})
+            SELECT dim.* EXCLUDE (_row), {derived}
+            FROM dim LEFT JOIN metrics m ON dim.{key} = m.{key}
+            ORDER BY dim._row
+        '''
+        return self._query(sql, dim=self._with_row(df_dim), transactions=df_transactions)
+
+    def customer_features(self, df_customers, df_transactions):
+        return self._metrics(
+            df_customers, 'customer_id', df_transactions,
+            '''sum(total_amount) AS lifetime_value, count(transaction_id) AS transaction_count,
+               date_diff('day', min(transaction_date), max(transaction_date)) AS customer_tenure_days''',
+            '''m.lifetime_value, m.transaction_count, m.customer_tenure_days,
+               m.lifetime_value / m.transaction_count AS avg_order_value''')
+
+    def product_features(self, df_products, df_transactions):
+        margin = 'round_even((dim.unit_price - dim.unit_cost) / dim.unit_price * 100 * 100, 0) / 100'
+        return self._metrics(
+            df_products, 'product_id', df_transactions,
+            '''sum(quantity) AS total_units_sold, sum(total_amount) AS total_revenue,
+               sum(profit) AS total_profit, count(transaction_id) AS num_sales''',
+            f'''CAST(m.total_units_sold AS BIGINT) AS total_units_sold, m.total_revenue, m.total_profit,
+                m.num_sales, m.total_profit / m.num_sales AS avg_profit_per_sale, {margin} AS margin_pct,
+                CASE WHEN {margin} < 30 THEN 'Low Margin' WHEN {margin} < 50 THEN 'Medium Margin'
+                     ELSE 'High Margin' END AS margin_category''')
+
+    def store_features(self, df_stores, df_transactions):
+        return self._metrics(
+            df_stores, 'store_id', df_transactions,
+            '''sum(total_amount) AS total_revenue, sum(profit) AS total_profit,
+               count(transaction_id) AS num_transactions, count(DISTINCT customer_id) AS unique_customers''',
+            '''m.total_revenue, m.total_profit, m.num_transactions, m.unique_customers,
+               m.total_revenue / m.num_transactions AS revenue_per_transaction,
+               m.total_revenue / m.unique_customers AS revenue_per_customer''')
+
+    def master(self, df_transactions, df_products, df_stores, df_customers):
+        selects, joins = [], []
+        for name, (key, columns) in MASTER_COLUMNS.items():
+            selects += [f'{name}.{col}' for col in columns]
+            joins.append(f'LEFT JOIN {name} ON fact.{key} = {name}.{key}')
+        sql = f'''
+            SELECT fact.* EXCLUDE (_row), {', '.join(selects)}
+            FROM fact {' '.join(joins)}
+            ORDER BY fact._row
+        '''
+        return self._query(sql, fact=self._with_row(df_transactions), products=df_products,
+                           stores=df_stores, customers=df_customers)
+
+    def rfm(self, df_transactions):
+        sql = '''
+            WITH bounds AS (SELECT max(transaction_date) + INTERVAL 1 DAY AS analysis_date FROM transactions)
+            SELECT customer_id,
+                   date_diff('day', max(transaction_date), any_value(analysis_date)) AS recency,
+                   count(transaction_date) AS frequency,
+                   sum(total_amount) AS monetary
+            FROM transactions, bounds
+            GROUP BY customer_id
+            ORDER BY customer_id
+        '''
+        return score_rfm(self._query(sql, transactions=df_transactions))
+
+    def cohorts(self, df_transactions):
+        sql = '''
+            WITH pairs AS (
+                SELECT DISTINCT customer_id,
+                       (year(transaction_date) - 1970) * 12 + month(transaction_date) - 1 AS period
+                FROM transactions
+            ), first AS (
+                SELECT customer_id, min(period) AS cohort FROM pairs GROUP BY customer_id
+            )
+            SELECT cohort, period - cohort AS period_number, count(*) AS customers
+            FROM pairs JOIN first USING (customer_id)
+            GROUP BY ALL
+        '''
+        return _cohort_tables(self._query(sql, transactions=df_transactions))
+
+
+BACKENDS = {'pandas': PandasBackend, 'polars': PolarsBackend, 'duckdb': DuckDBBackend}
+
+
+def get_backend(name='pandas'):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}', expected one of {list(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+def run_stages(backend, df_products, df_stores, df_customers, df_transactions):
+    # the backend stages in pipeline order, on copies so the inputs can be reused
+    import data_cleaning_pipeline as pipeline
+    df_stores, df_customers = df_stores.copy(), df_customers.copy()
+    pipeline.convert_types(df_stores=df_stores, df_customers=df_customers)
+
+    df_transactions, removed = backend.dedup(df_transactions.copy())
+    df_transactions = backend.transaction_features(backend.convert_types(df_transactions))
+    df_customers = backend.customer_features(df_customers, df_transactions)
+    df_products = backend.product_features(df_products.copy(), df_transactions)
+    df_stores = backend.store_features(df_stores, df_transactions)
+    cohort_counts, cohort_pct = backend.cohorts(df_transactions)
+    return {
+        'transactions': df_transactions,
+        'customers': df_customers,
+        'products': df_products,
+        'stores': df_stores,
+        'master': backend.master(df_transactions, df_products, df_stores, df_customers),
+        'rfm': backend.rfm(df_transactions),
+        'cohort_counts': cohort_counts,
+        'cohort_pct': cohort_pct,
+    }
+
+
+def check_parity(data_dir='.', backends=('polars', 'duckdb'), rtol=PARITY_RTOL):
+    import data_cleaning_pipeline as pipeline
+    raw = pipeline.load_raw_data(data_dir)
+    reference = run_stages(PandasBackend(), *raw)
+
+    rows = []
+    for name in backends:
+        results = run_stages(get_backend(name), *raw)
+        for stage, expected in reference.items():
+            actual = results[stage]
+            try:
+                # row labels only carry meaning for the cohort tables (pandas keeps pre-dedup labels)
+                if not stage.startswith('cohort'):
+                    expected, actual = expected.reset_index(drop=True), actual.reset_index(drop=True)
+                pd.testing.assert_frame_equal(expected, actual, check_dtype=False, check_exact=False,
+                                              rtol=rtol, check_index_type=False, check_column_type=False)
+                rows.append({'backend': name, 'stage': stage, 'rows': len(actual), 'match': True, 'detail': ''})
+            except AssertionError as e:
+                rows.append({'backend': name, 'stage': stage, 'rows': len(actual), 'match': False,
+                             'detail': ' '.join(str(e).split())[:200]})
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that every backend reproduces the pandas results')
+    parser.add_argument('--data-dir', default='.', help='directory with the raw CSVs')
+    parser.add_argument('--backends', default='polars,duckdb')
+    parser.add_argument('--rtol', type=float, default=PARITY_RTOL)
+    args = parser.parse_args()
+
+    report = check_parity(args.data_dir, args.backends.split(','), args.rtol)
+    with pd.option_context('display.width', 200, 'display.max_colwidth', 120):
+        print(report.to_string(index=False))
+    failed = report[~report['match']]
+    print(f"\n{'✗' if len(failed) else '✓'} {report['match'].sum()}/{len(report)} stage results match pandas")
+    sys.exit(1 if len(failed) else 0)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+# Market-basket mining on a sparse basket x product matrix. Pair counts come
+# from one sparse product X.T @ X; longer itemsets reuse the same product on the
+# baskets that contain each frequent prefix.
+
+def basket_matrix(df, basket_cols=('customer_id', 'transaction_date'), item_col='product_id'):
+    basket_codes = df.groupby(list(basket_cols), sort=False).ngroup().to_numpy()
+    item_codes, items = pd.factorize(df[item_col], sort=True)
+    n_baskets = basket_codes.max() + 1 if len(basket_codes) else 0
+    X = sparse.csr_matrix((np.ones(len(df), dtype=np.int32), (basket_codes, item_codes)),
+                          shape=(n_baskets, len(items)))
+    X.data[:] = 1  # duplicate lines of the same product count once
+    basket_sizes = np.bincount(basket_codes, minlength=n_baskets)
+    return X, pd.Index(items, name=item_col), basket_sizes
+
+
+def frequent_itemsets(X, min_support=0.001, max_len=3):
+    n_baskets = X.shape[0]
+    min_count = max(int(np.ceil(min_support * n_baskets)), 1)
+    X = X.tocsr()
+    Xc = X.tocsc()
+
+    item_counts = np.asarray(X.sum(axis=0)).ravel()
+    frequent_items = np.flatnonzero(item_counts >= min_count)
+    counts = {(int(i),): int(item_counts[i]) for i in frequent_items}
+
+    # Each level is counted per prefix: restrict X to the baskets holding the
+    # prefix and one sparse product gives every (prefix, b, c) count at once.
+    prefixes = [()]
+    for _ in range(2, max_len + 1):
+        level = {}
+        for prefix in prefixes:
+            if prefix:
+                rows = np.flatnonzero(np.asarray(Xc[:, list(prefix)].sum(axis=1)).ravel() == len(prefix))
+                if len(rows) < min_count:
+                    continue
+                sub = X[rows]
+            else:
+                sub = X
+            candidates = frequent_items[frequent_items > (prefix[-1] if prefix else -1)]
+            if len(candidates) < 2:
+                continue
+            sub = sub[:, candidates]
+            pairs = sparse.triu(sub.T @ sub, k=1).tocoo()
+            keep = pairs.data >= min_count
+            # support is anti-monotone, so every subset of a kept itemset is frequent too
+            for b, c, count in zip(candidates[pairs.row[keep]], candidates[pairs.col[keep]], pairs.data[keep]):
+                level[prefix + (int(b), int(c))] = int(count)
+        if not level:
+            break
+        counts.update(level)
+        prefixes = sorted({itemset[:-1] for itemset in level})
+    return counts
+
+
+def association_rules(itemset_counts, n_baskets, items=None, min_confidence=0.0):
+    # single-consequent rules {antecedent} -> consequent
+    rows = []
+    for itemset, count in itemset_counts.items():
+        if len(itemset) < 2:
+            continue
+        for i, consequent in enumerate(itemset):
+            antecedent = itemset[:i] + itemset[i + 1:]
+            confidence = count / itemset_counts[antecedent]
+            if confidence < min_confidence:
+                continue
+            consequent_support = itemset_counts[(consequent,)] / n_baskets
+            rows.append((antecedent, consequent, count, count / n_baskets,
+                         confidence, confidence / consequent_support))
+
+    rules = pd.DataFrame(rows, columns=['antecedent', 'consequent', 'count', 'support',
+                                        'confidence', 'lift'])
+    if items is not None and len(rules):
+        labels = np.asarray(items)
+        rules['antecedent'] = [tuple(labels[list(a)]) for a in rules['antecedent']]
+        rules['consequent'] = labels[rules['consequent'].to_numpy()]
+    return rules
+
+
+def top_cross_sell_rules(df, n=10, min_support=0.001, min_confidence=0.0, max_len=3, by='lift'):
+    X, items, _ = basket_matrix(df)
+    itemset_counts = frequent_itemsets(X, min_support, max_len)
+    rules = association_rules(itemset_counts, X.shape[0], items, min_confidence)
+    if rules.empty:
+        return rules
+    return rules.sort_values([by, 'count'], ascending=False).head(n).reset_index(drop=True)
@@ -0,0 +1,390 @@
+import argparse
+import csv
+import importlib.metadata
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+
+# End-to-end benchmark suite. Every stage of the project (data generation,
+# cleaning, Postgres load, queries.sql, chart rendering) runs as its own
+# process on a fresh working directory at several dataset scales, and its wall
+# time, rows per second and peak memory are recorded. Results are written as
+# versioned JSON and compared against a stored baseline to flag regressions.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmark_results')
+BASELINE_PATH = os.path.join(RESULTS_DIR, 'baseline.json')
+SCHEMA_VERSION = 2
+
+SCALES = [10_000, 50_000, 200_000]
+STAGES = ['generate', 'clean', 'load', 'queries', 'render']
+THRESHOLD = 0.20
+# absolute changes below these are treated as noise, whatever the ratio
+NOISE = {'wall_seconds': 0.1, 'peak_rss_mb': 10, 'tree_rss_mb': 10}
+# how often the memory of a stage's process tree is sampled
+RSS_SAMPLE_SECONDS = 0.1
+
+# table -> (CSV, key column), to check a load against the files it read
+LOAD_TABLES = {
+    'dim_products': ('products.csv', 'product_id'),
+    'dim_stores': ('stores.csv', 'store_id'),
+    'dim_customers': ('customers.csv', 'customer_id'),
+    'fact_sales': ('transactions.csv', 'transaction_id'),
+}
+
+# minimal star schema matching the INSERTs in load_data_to_postgres.py
+SCHEMA_SQL = '''
+CREATE TABLE dim_products (
+    product_id INTEGER PRIMARY KEY, product_name TEXT, category TEXT,
+    unit_cost NUMERIC(10, 2), unit_price NUMERIC(10, 2));
+CREATE TABLE dim_stores (
+    store_id INTEGER PRIMARY KEY, store_name TEXT, region TEXT, city TEXT, state TEXT,
+    opened_date DATE);
+CREATE TABLE dim_customers (
+    customer_id INTEGER PRIMARY KEY, customer_name TEXT, email TEXT, join_date DATE,
+    customer_segment TEXT);
+CREATE TABLE fact_sales (
+    transaction_id INTEGER PRIMARY KEY, transaction_date DATE,
+    store_id INTEGER REFERENCES dim_stores, customer_id INTEGER REFERENCES dim_customers,
+    product_id INTEGER REFERENCES dim_products, quantity INTEGER, unit_price NUMERIC(10, 2),
+    discount_pct NUMERIC(5, 2), discount_amount NUMERIC(10, 2), total_amount NUMERIC(12, 2),
+    total_cost NUMERIC(12, 2), profit NUMERIC(12, 2), profit_margin NUMERIC(6, 2),
+    payment_method TEXT);
+'''
+
+
+class ThrowawayPostgres:
+    # a private cluster in a temp directory, reachable only through its unix socket
+    def __init__(self, bin_dir=None, database='retail_sales_analytics'):
+        self.database = database
+        self.bin = {name: shutil.which(name, path=bin_dir) for name in ['initdb', 'pg_ctl', 'psql']}
+        self.directory = None
+        self.port = None
+
+    @property
+    def available(self):
+        return all(self.bin.values())
+
+    def env(self):
+        return {'PGHOST': self.directory, 'PGPORT': str(self.port), 'PGUSER': 'postgres',
+                'PGPASSWORD': '', 'PGDATABASE': self.database}
+
+    def psql(self, *args, database=None):
+        env = dict(os.environ, **dict(self.env(), PGDATABASE=database or self.database))
+        return subprocess.run([self.bin['psql'], '-X', '-q', '-v', 'ON_ERROR_STOP=1', *args],
+                              env=env, check=True, capture_output=True, text=True).stdout
+
+    def count(self, table):
+        return int(self.psql('-At', '-c', f'SELECT COUNT(*) FROM {table}'))
+
+    def __enter__(self):
+        self.directory = tempfile.mkdtemp(prefix='bench_pg_')
+        data_dir = os.path.join(self.directory, 'data')
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            self.port = s.getsockname()[1]
+        subprocess.run([self.bin['initdb'], '-D', data_dir, '-U', 'postgres', '-A', 'trust'],
+                       check=True, capture_output=True)
+        subprocess.run([self.bin['pg_ctl'], '-D', data_dir, '-l', os.path.join(self.directory, 'server.log'),
+                        '-w', '-o', f"-p {self.port} -k {self.directory} -c listen_addresses=''", 'start'],
+                       check=True, capture_output=True)
+        self.psql('-c', f'CREATE DATABASE {self.database}', database='postgres')
+        self.psql('-c', SCHEMA_SQL)
+        return self
+
+    def reset(self):
+        self.psql('-c', 'TRUNCATE fact_sales, dim_customers, dim_stores, dim_products')
+
+    def __exit__(self, *exc):
+        subprocess.run([self.bin['pg_ctl'], '-D', os.path.join(self.directory, 'data'), '-m', 'fast', 'stop'],
+                       capture_output=True)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def tree_rss(pid):
+    # summed resident memory (bytes) of pid and all its descendants, from /proc (Linux only)
+    children, rss = {}, {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+        rss[int(entry)] = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+    total, pending = 0, [pid]
+    while pending:
+        pid = pending.pop()
+        total += rss.get(pid, 0)
+        pending.extend(children.get(pid, []))
+    return total
+
+
+def run_stage(stage, command, cwd, env, rows):
+    log_path = os.path.join(cwd, f'{stage}.log')
+    with open(log_path, 'w') as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(command, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # worker pools run concurrently, so their memory adds up: the summed RSS of the stage's
+        # process tree is sampled while it runs
+        peak_tree = [None]
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(RSS_SAMPLE_SECONDS):
+                peak_tree[0] = max(peak_tree[0] or 0, tree_rss(proc.pid))
+
+        sampler = threading.Thread(target=sample, daemon=True) if os.path.isdir('/proc') else None
+        if sampler:
+            sampler.start()
+        # wait4's ru_maxrss (KiB on Linux) is the peak of the largest single process: the stage
+        # itself or any worker it has reaped, whichever was biggest
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+        done.set()
+        if sampler:
+            sampler.join()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    result = {
+        'stage': stage,
+        'scale': rows,
+        'status': 'ok' if proc.returncode == 0 else 'failed',
+        'wall_seconds': round(wall, 3),
+        'rows_per_second': round(rows / wall, 1),
+        'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),
+        # None when the stage finished before the first sample (or without /proc)
+        'tree_rss_mb': round(peak_tree[0] / 2**20, 1) if peak_tree[0] else None,
+    }
+    if proc.returncode != 0:
+        with open(log_path) as log:
+            result['reason'] = log.read()[-500:]
+    return result
+
+
+def check_load(result, workdir, postgres):
+    # a table that failed to load (the loader prints ✗) or whose row count differs from the
+    # distinct keys in its CSV fails the stage, so a partial load is never timed as a full one
+    if result['status'] != 'ok':
+        return result
+    with open(os.path.join(workdir, 'load.log')) as log:
+        problems = [line.strip() for line in log.read().splitlines() if '✗' in line]
+    for table, (filename, key) in LOAD_TABLES.items():
+        with open(os.path.join(workdir, filename), newline='') as f:
+            expected = len({row[key] for row in csv.DictReader(f)})
+        loaded = postgres.count(table)
+        if loaded != expected:
+            problems.append(f'{table}: {loaded:,} rows loaded, {expected:,} in {filename}')
+    if problems:
+        return dict(result, status='failed', reason='\n'.join(problems))
+    return result
+
+
+def skipped(stage, rows, reason):
+    return {'stage': stage, 'scale': rows, 'status': 'skipped', 'reason': reason}
+
+
+def best_of(repeat, run):
+    # the fastest of several runs is the least noisy estimate of the stage cost
+    results = [run() for _ in range(repeat)]
+    ok = [result for result in results if result['status'] == 'ok']
+    return min(ok, key=lambda result: result['wall_seconds']) if ok else results[-1]
+
+
+def benchmark_scale(rows, stages, repeat, postgres=None, keep_workdir=False):
+    workdir = tempfile.mkdtemp(prefix=f'bench_{rows}_')
+    env = dict(os.environ, RETAIL_NUM_TRANSACTIONS=str(rows), PYTHONDONTWRITEBYTECODE='1')
+    script = lambda name: [sys.executable, os.path.join(REPO_DIR, name)]
+    results = []
+    try:
+        # generation always runs: every later stage needs its CSVs
+        generated = best_of(repeat, lambda: run_stage('generate', script('generate_data.py'), workdir, env, rows))
+        if 'generate' in stages:
+            results.append(generated)
+        if generated['status'] != 'ok':
+            return results + [skipped(stage, rows, 'data generation failed')
+                              for stage in stages if stage != 'generate']
+
+        if 'clean' in stages or 'render' in stages:
+            cleaned = best_of(repeat, lambda: run_stage('clean', script('data_cleaning_pipeline.py'),
+                                                        workdir, env, rows))
+            if 'clean' in stages:
+                results.append(cleaned)
+
+        if 'load' in stages or 'queries' in stages:
+            if postgres is None:
+                reason = 'no PostgreSQL binaries (initdb, pg_ctl, psql) found'
+            elif importlib.util.find_spec('psycopg2') is None:
+                reason = 'psycopg2 is not installed'
+            else:
+                reason = None
+            if reason:
+                results += [skipped(stage, rows, reason) for stage in ['load', 'queries'] if stage in stages]
+            else:
+                pg_env = dict(env, **postgres.env())
+
+                def load():
+                    postgres.reset()
+                    return check_load(run_stage('load', script('load_data_to_postgres.py'), workdir, pg_env, rows),
+                                      workdir, postgres)
+
+                loaded = best_of(repeat, load)
+                if 'load' in stages:
+                    results.append(loaded)
+                if 'queries' in stages:
+                    # the first failing statement stops psql, so a broken query fails the stage
+                    # instead of timing a run that skipped it
+                    command = [postgres.bin['psql'], '-X', '-q', '-v', 'ON_ERROR_STOP=1', '-o', os.devnull,
+                               '-f', os.path.join(REPO_DIR, 'queries.sql')]
+                    results.append(best_of(repeat, lambda: run_stage('queries', command, workdir, pg_env, rows)))
+
+        if 'render' in stages:
+            if cleaned['status'] != 'ok':
+                results.append(skipped('render', rows, 'cleaning failed'))
+            else:
+                results.append(best_of(repeat, lambda: run_stage('render', script('visualizations.py') + ['--force'],
+                                                                 workdir, env, rows)))
+    finally:
+        if not keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def environment():
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=REPO_DIR, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    packages = {}
+    for name in ['pandas', 'numpy', 'scipy', 'matplotlib', 'seaborn', 'psycopg2-binary', 'psycopg2']:
+        try:
+            packages[name] = importlib.metadata.version(name)
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    return {
+        'git_commit': git('rev-parse', '--short', 'HEAD'),
+        'git_dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'packages': packages,
+    }
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    reference = {(r['stage'], r['scale']): r for r in baseline['results'] if r['status'] == 'ok'}
+    regressions = []
+    for result in results:
+        base = reference.get((result['stage'], result['scale']))
+        if result['status'] != 'ok' or base is None:
+            continue
+        for metric, noise in NOISE.items():
+            if result.get(metric) is None or base.get(metric) is None:
+                continue
+            change = result[metric] / base[metric] - 1 if base[metric] else 0
+            if change > threshold and result[metric] - base[metric] > noise:
+                regressions.append({'stage': result['stage'], 'scale': result['scale'], 'metric': metric,
+                                    'baseline': base[metric], 'current': result[metric],
+                                    'change_pct': round(change * 100, 1)})
+    return regressions
+
+
+def print_results(results, regressions):
+    flagged = {(r['stage'], r['scale']) for r in regressions}
+    # peak RSS: largest single process; tree RSS: the stage and its workers together
+    print(f"\n{'stage':<10}{'scale':>10}{'wall (s)':>11}{'rows/s':>12}{'peak RSS (MB)':>15}{'tree RSS (MB)':>15}")
+    for r in results:
+        if r['status'] != 'ok':
+            reason = r['reason'].strip().splitlines()[-1] if r.get('reason') else ''
+            print(f"{r['stage']:<10}{r['scale']:>10,}  {r['status']}: {reason}")
+            continue
+        mark = '  ✗ regression' if (r['stage'], r['scale']) in flagged else ''
+        tree = f"{r['tree_rss_mb']:>15.1f}" if r.get('tree_rss_mb') is not None else f"{'-':>15}"
+        print(f"{r['stage']:<10}{r['scale']:>10,}{r['wall_seconds']:>11.2f}{r['rows_per_second']:>12,.0f}"
+              f"{r['peak_rss_mb']:>15.1f}{tree}{mark}")
+    for r in regressions:
+        print(f"✗ {r['stage']} @ {r['scale']:,}: {r['metric']} {r['baseline']} -> {r['current']} "
+              f"(+{r['change_pct']}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every project stage at several dataset scales')
+    parser.add_argument('--scales', default=','.join(map(str, SCALES)),
+                        help='comma-separated numbers of transactions')
+    parser.add_argument('--stages', default=','.join(STAGES), help=f"comma-separated subset of {STAGES}")
+    parser.add_argument('--repeat', type=int, default=1, help='runs per stage, the fastest is kept')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative slowdown / memory growth flagged as a regression')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    parser.add_argument('--pg-bin', default=None, help='directory with initdb, pg_ctl and psql')
+    parser.add_argument('--keep-workdir', action='store_true')
+    args = parser.parse_args(argv)
+
+    scales = [int(scale) for scale in args.scales.split(',')]
+    stages = [stage for stage in STAGES if stage in args.stages.split(',')]
+    postgres = ThrowawayPostgres(args.pg_bin)
+    use_postgres = postgres.available and ('load' in stages or 'queries' in stages)
+
+    results = []
+    started = datetime.now()
+    if use_postgres:
+        postgres.__enter__()
+    try:
+        for rows in scales:
+            print(f"Benchmarking {rows:,} transactions...")
+            results += benchmark_scale(rows, stages, args.repeat, postgres if use_postgres else None,
+                                       args.keep_workdir)
+    finally:
+        if use_postgres:
+            postgres.__exit__(None, None, None)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold) if baseline else []
+
+    run = {
+        'schema_version': SCHEMA_VERSION,
+        'created': started.isoformat(timespec='seconds'),
+        'environment': environment(),
+        'scales': scales,
+        'stages': stages,
+        'repeat': args.repeat,
+        'results': results,
+        'baseline': baseline['created'] if baseline else None,
+        'threshold': args.threshold,
+        'regressions': regressions,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{started:%Y%m%d-%H%M%S}_{run['environment']['git_commit'] or 'nogit'}.json")
+    with open(path, 'w') as f:
+        json.dump(run, f, indent=2)
+    if args.save_baseline:
+        shutil.copyfile(path, args.baseline)
+
+    print_results(results, regressions)
+    print(f"\n✓ Results saved: {os.path.relpath(path)}")
+    if args.save_baseline:
+        print(f"✓ Baseline saved: {os.path.relpath(args.baseline)}")
+    elif baseline is None:
+        print("No baseline to compare against (run with --save-baseline to store one)")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
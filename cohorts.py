@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+
+# Cohort retention on integer period indices. Periods are pandas Period
+# ordinals (months or Monday-start weeks since 1970), so each (customer, period)
+# pair packs into one int64 and the matrix is a single 2-D bincount.
+WEEK_ORIGIN = pd.Timestamp('1969-12-22')  # Monday starting W-SUN period 0
+
+
+def period_index(dates, freq='M'):
+    dates = pd.to_datetime(dates)
+    if freq == 'M':
+        return ((dates.dt.year - 1970) * 12 + dates.dt.month - 1).to_numpy(dtype=np.int64)
+    if freq == 'W':
+        return ((dates - WEEK_ORIGIN).dt.days // 7).to_numpy(dtype=np.int64)
+    raise ValueError(f"Unsupported cohort frequency: {freq}")
+
+
+class CohortMatrix:
+    def __init__(self, freq='M', customer_col='customer_id', date_col='transaction_date'):
+        self.freq = freq
+        self.customer_col = customer_col
+        self.date_col = date_col
+        self.first_period = pd.Series(dtype='int64')
+        # sorted, unique (customer << 32 | period) keys of active customer-periods
+        self.active = np.empty(0, dtype=np.int64)
+
+    def update(self, df):
+        customers = df[self.customer_col].to_numpy(dtype=np.int64)
+        periods = period_index(df[self.date_col], self.freq)
+
+        first = pd.Series(periods).groupby(customers).min()
+        self.first_period = (pd.concat([self.first_period, first])
+                             .groupby(level=0).min().astype('int64'))
+        self.active = np.union1d(self.active, (customers << 32) | periods)
+        return self
+
+    def counts(self):
+        if len(self.active) == 0:
+            return pd.DataFrame()
+        customers = self.active >> 32
+        periods = self.active & 0xFFFFFFFF
+        cohort = self.first_period.reindex(customers).to_numpy()
+        period_number = periods - cohort
+
+        first_cohort = cohort.min()
+        n_cohorts = cohort.max() - first_cohort + 1
+        n_periods = period_number.max() + 1
+        flat = (cohort - first_cohort) * n_periods + period_number
+        matrix = np.bincount(flat, minlength=n_cohorts * n_periods).reshape(n_cohorts, n_periods)
+
+        labels = pd.PeriodIndex.from_ordinals(np.arange(first_cohort, first_cohort + n_cohorts),
+                                              freq='M' if self.freq == 'M' else 'W-SUN')
+        counts = pd.DataFrame(matrix, index=labels, columns=pd.RangeIndex(n_periods))
+        counts.index.name = 'cohort'
+        counts.columns.name = 'period_number'
+        # cohorts with no new customers in that period are gaps, not zero-size cohorts
+        return counts[counts[0] > 0]
+
+    def retention(self):
+        counts = self.counts()
+        return (counts.div(counts[0], axis=0) * 100).round(2)
+
+
+def cohort_retention(df, freq='M'):
+    cohorts = CohortMatrix(freq).update(df)
+    return cohorts.counts(), cohorts.retention()
@@ -1,439 +1,103 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime
+import argparse
+import os
 import warnings
-warnings.filterwarnings('ignore')
-
-
-df_products = pd.read_csv('products.csv')
-df_stores = pd.read_csv('stores.csv')
-df_customers = pd.read_csv('customers.csv')
-df_transactions = pd.read_csv('transactions.csv')
 
+import pandas as pd
 
-def assess_data_quality(df, name):
-    print(f"\n{name} Table:")
-    print(f"  Shape: {df.shape}")
-    print(f"  Missing Values:")
-    missing = df.isnull().sum()
-    if missing.sum() > 0:
-        print(missing[missing > 0])
-    else:
-        print("    None")
-    
-    print(f"  Duplicates: {df.duplicated().sum()}")
-    print(f"  Memory Usage: {df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
-
-assess_data_quality(df_products, "PRODUCTS")
-assess_data_quality(df_stores, "STORES")
-assess_data_quality(df_customers, "CUSTOMERS")
-assess_data_quality(df_transactions, "TRANSACTIONS")
-
-# data cleaning
-# check for nulls in critical columns
-critical_cols_transactions = ['transaction_id', 'transaction_date', 'product_id', 
-                               'store_id', 'customer_id', 'total_amount']
-
-for col in critical_cols_transactions:
-    null_count = df_transactions[col].isnull().sum()
-    if null_count > 0:
-        print(f" {col}: {null_count} missing values")
-    else:
-        print(f"  {col}: No missing values")
-
-# filling missing discount values with 0
-df_transactions['discount_pct'] = df_transactions['discount_pct'].fillna(0)
-df_transactions['discount_amount'] = df_transactions['discount_amount'].fillna(0)
-
-# removing duplicates
-initial_count = len(df_transactions)
-df_transactions = df_transactions.drop_duplicates(subset=['transaction_id'])
-removed = initial_count - len(df_transactions)
-print(f"  Removed {removed} duplicate transactions")
-
-# data type conversion
-df_transactions['transaction_date'] = pd.to_datetime(df_transactions['transaction_date'])
-df_stores['opened_date'] = pd.to_datetime(df_stores['opened_date'])
-df_customers['join_date'] = pd.to_datetime(df_customers['join_date'])
-
-
-def detect_outliers(df, column):
-    Q1 = df[column].quantile(0.25)
-    Q3 = df[column].quantile(0.75)
-    IQR = Q3 - Q1
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
-    outliers = df[(df[column] < lower_bound) | (df[column] > upper_bound)]
-    return outliers, lower_bound, upper_bound
-
-outliers, lower, upper = detect_outliers(df_transactions, 'total_amount')
-print(f"  Total Amount Outliers: {len(outliers)} transactions")
-print(f"  Bounds: [{lower:.2f}, {upper:.2f}]")
-
-# Validating Business Logic
-# Check for negative values
-negative_checks = {
-    'quantity': (df_transactions['quantity'] < 0).sum(),
-    'total_amount': (df_transactions['total_amount'] < 0).sum(),
-    'profit': (df_transactions['profit'] < 0).sum()
+from data_profiler import StreamingProfiler
+from validation_rules import RuleEngine, transaction_rules
+from olap_cube import SalesCube
+from rollup_store import TimeRollupStore
+from pipeline_trace import PipelineTracer
+from backends import BACKENDS, get_backend
+from zone_maps import STORE_DIR, ZonedTable
+
+
+# Cleaning, feature engineering and analytics for the retail dataset. Every
+# step is a function that can be imported on its own; run_pipeline() chains
+# them (and prints the console report), main() is the command line entry.
+# Importing this module loads no data and prints nothing.
+RAW_TABLES = ['products', 'stores', 'customers', 'transactions']
+SOURCES = ['csv', 'postgres']
+CLEANED_FILES = {
+    'transactions': 'transactions_cleaned.csv',
+    'master': 'master_dataset.csv',
+    'products': 'products_cleaned.csv',
+    'customers': 'customers_cleaned.csv',
+    'stores': 'stores_cleaned.csv',
 }
 
-for field, count in negative_checks.items():
-    if count > 0:
-        print(f" {field}: {count} negative values")
-    else:
-        print(f" {field}: No negative values")
-
-# Validating profit calculation
-df_transactions['calculated_profit'] = df_transactions['total_amount'] - df_transactions['total_cost']
-profit_mismatch = abs(df_transactions['profit'] - df_transactions['calculated_profit']) > 0.01
-print(f"  Profit calculation mismatches: {profit_mismatch.sum()}")
-
-# data transformation
-# creating time-based features
-
-df_transactions['year'] = df_transactions['transaction_date'].dt.year
-df_transactions['month'] = df_transactions['transaction_date'].dt.month
-df_transactions['month_name'] = df_transactions['transaction_date'].dt.month_name()
-df_transactions['quarter'] = df_transactions['transaction_date'].dt.quarter
-df_transactions['day_of_week'] = df_transactions['transaction_date'].dt.dayofweek
-df_transactions['day_name'] = df_transactions['transaction_date'].dt.day_name()
-df_transactions['week_of_year'] = df_transactions['transaction_date'].dt.isocalendar().week
-df_transactions['is_weekend'] = df_transactions['day_of_week'].isin([5, 6]).astype(int)
-
-# Creating season
-def get_season(month):
-    if month in [12, 1, 2]:
-        return 'Winter'
-    elif month in [3, 4, 5]:
-        return 'Spring'
-    elif month in [6, 7, 8]:
-        return 'Summer'
-    else:
-        return 'Fall'
-
-df_transactions['season'] = df_transactions['month'].apply(get_season)
-
-
-# Profit margin percentage
-df_transactions['profit_margin_pct'] = (
-    df_transactions['profit'] / df_transactions['total_amount'] * 100
-).round(2)
-
-# Discount effectiveness
-df_transactions['discount_given'] = (df_transactions['discount_pct'] > 0).astype(int)
-
-# Revenue per unit
-df_transactions['revenue_per_unit'] = (
-    df_transactions['total_amount'] / df_transactions['quantity']
-).round(2)
-
-# Transaction size category
-def categorize_transaction(amount):
-    if amount < 50:
-        return 'Small'
-    elif amount < 200:
-        return 'Medium'
-    elif amount < 500:
-        return 'Large'
-    else:
-        return 'Very Large'
-
-df_transactions['transaction_size'] = df_transactions['total_amount'].apply(categorize_transaction)
-
-# Customer features
-# Customer lifetime value
-customer_ltv = df_transactions.groupby('customer_id').agg({
-    'total_amount': 'sum',
-    'transaction_id': 'count',
-    'transaction_date': ['min', 'max']
-}).reset_index()
-
-customer_ltv.columns = ['customer_id', 'lifetime_value', 'transaction_count', 'first_purchase', 'last_purchase']
-customer_ltv['customer_tenure_days'] = (customer_ltv['last_purchase'] - customer_ltv['first_purchase']).dt.days
-customer_ltv['avg_order_value'] = customer_ltv['lifetime_value'] / customer_ltv['transaction_count']
-
-# Merge back to customers
-df_customers = df_customers.merge(customer_ltv[['customer_id', 'lifetime_value', 'transaction_count', 
-                                                  'customer_tenure_days', 'avg_order_value']], 
-                                   on='customer_id', how='left')
-
-print(" Created: lifetime_value, transaction_count, customer_tenure_days, avg_order_value")
-
-# Creating Product features
-# Product performance metrics
-product_metrics = df_transactions.groupby('product_id').agg({
-    'quantity': 'sum',
-    'total_amount': 'sum',
-    'profit': 'sum',
-    'transaction_id': 'count'
-}).reset_index()
-
-product_metrics.columns = ['product_id', 'total_units_sold', 'total_revenue', 'total_profit', 'num_sales']
-product_metrics['avg_profit_per_sale'] = product_metrics['total_profit'] / product_metrics['num_sales']
-
-df_products = df_products.merge(product_metrics, on='product_id', how='left')
-
-# Product margin category
-df_products['margin_pct'] = ((df_products['unit_price'] - df_products['unit_cost']) / 
-                              df_products['unit_price'] * 100).round(2)
-
-def categorize_margin(margin):
-    if margin < 30:
-        return 'Low Margin'
-    elif margin < 50:
-        return 'Medium Margin'
-    else:
-        return 'High Margin'
-
-df_products['margin_category'] = df_products['margin_pct'].apply(categorize_margin)
-
-print("  ✓ Created: total_units_sold, total_revenue, margin_category")
-
-# Creating store features
-# Store performance metrics
-store_metrics = df_transactions.groupby('store_id').agg({
-    'total_amount': 'sum',
-    'profit': 'sum',
-    'transaction_id': 'count',
-    'customer_id': 'nunique'
-}).reset_index()
-
-store_metrics.columns = ['store_id', 'total_revenue', 'total_profit', 'num_transactions', 'unique_customers']
-store_metrics['revenue_per_transaction'] = store_metrics['total_revenue'] / store_metrics['num_transactions']
-store_metrics['revenue_per_customer'] = store_metrics['total_revenue'] / store_metrics['unique_customers']
-
-df_stores = df_stores.merge(store_metrics, on='store_id', how='left')
-
-print(" Created: total_revenue, revenue_per_transaction, unique_customers")
-
-# Create Master Analytical Dataset
-print("\n Creating Master Analytical Dataset...")
-
-df_master = df_transactions.merge(df_products[['product_id', 'product_name', 'category', 'margin_category']], 
-                                   on='product_id', how='left')
-df_master = df_master.merge(df_stores[['store_id', 'store_name', 'region', 'city']], 
-                             on='store_id', how='left')
-df_master = df_master.merge(df_customers[['customer_id', 'customer_segment', 'lifetime_value']], 
-                             on='customer_id', how='left')
-
 
-# Data Analytics
-# Descriptive Statistics
-print("\n Transaction Summary Statistics:")
-summary_stats = df_transactions[['quantity', 'total_amount', 'profit', 'profit_margin_pct']].describe()
-print(summary_stats)
-
-# Revenue Analysis
-print("\n Revenue Breakdown:")
-print(f"  Total Revenue: ${df_transactions['total_amount'].sum():,.2f}")
-print(f"  Total Profit: ${df_transactions['profit'].sum():,.2f}")
-print(f"  Average Transaction Value: ${df_transactions['total_amount'].mean():.2f}")
-print(f"  Median Transaction Value: ${df_transactions['total_amount'].median():.2f}")
-print(f"  Overall Profit Margin: {(df_transactions['profit'].sum() / df_transactions['total_amount'].sum() * 100):.2f}%")
-
-# Time-based Analysis
-print("\n Temporal Patterns:")
-yearly_sales = df_transactions.groupby('year')['total_amount'].sum()
-print("\nRevenue by Year:")
-print(yearly_sales)
-
-monthly_avg = df_transactions.groupby('month_name')['total_amount'].mean().sort_values(ascending=False)
-print("\nTop 3 Months by Avg Transaction Value:")
-print(monthly_avg.head(3))
-
-# Category Performance
-print("\n Category Performance:")
-category_perf = df_master.groupby('category').agg({
-    'total_amount': 'sum',
-    'profit': 'sum',
-    'transaction_id': 'count'
-}).round(2)
-category_perf.columns = ['Revenue', 'Profit', 'Transactions']
-category_perf = category_perf.sort_values('Revenue', ascending=False)
-print(category_perf)
-
-# Regional Performance
-print("\n Regional Performance:")
-regional_perf = df_master.groupby('region').agg({
-    'total_amount': 'sum',
-    'profit': 'sum',
-    'transaction_id': 'count'
-}).round(2)
-regional_perf.columns = ['Revenue', 'Profit', 'Transactions']
-print(regional_perf)
-
-# Customer Segment Analysis
-print("\n Customer Segment Analysis:")
-segment_analysis = df_master.groupby('customer_segment').agg({
-    'customer_id': 'nunique',
-    'total_amount': ['sum', 'mean'],
-    'profit': 'sum'
-}).round(2)
-print(segment_analysis)
-
-
-# RFM Analysis (Recency, Frequency, Monetary)
-print("\n RFM Analysis...")
-
-analysis_date = df_transactions['transaction_date'].max() + pd.Timedelta(days=1)
-
-rfm = df_transactions.groupby('customer_id').agg({
-    'transaction_date': lambda x: (analysis_date - x.max()).days,  # Recency
-    'transaction_id': 'count',  # Frequency
-    'total_amount': 'sum'  # Monetary
-}).reset_index()
-
-rfm.columns = ['customer_id', 'recency', 'frequency', 'monetary']
-
-# Create RFM scores
-rfm['r_score'] = pd.qcut(rfm['recency'], 4, labels=[4, 3, 2, 1])
-rfm['f_score'] = pd.qcut(rfm['frequency'].rank(method='first'), 4, labels=[1, 2, 3, 4])
-rfm['m_score'] = pd.qcut(rfm['monetary'], 4, labels=[1, 2, 3, 4])
-
-rfm['rfm_score'] = rfm['r_score'].astype(str) + rfm['f_score'].astype(str) + rfm['m_score'].astype(str)
-
-print("  RFM Segments Distribution:")
-print(rfm['rfm_score'].value_counts().head(10))
-
-# Cohort Analysis
-print("\n Cohort Analysis...")
-
-df_transactions['order_month'] = df_transactions['transaction_date'].dt.to_period('M')
-df_transactions['cohort'] = df_transactions.groupby('customer_id')['transaction_date'].transform('min').dt.to_period('M')
-
-cohort_data = df_transactions.groupby(['cohort', 'order_month']).agg({
-    'customer_id': 'nunique'
-}).reset_index()
+def load_raw_data(data_dir='.', start=None, end=None):
+    # df_products, df_stores, df_customers, df_transactions; start/end (ISO dates,
+    # end exclusive) limit the transactions the same way the Postgres source does
+    df_products, df_stores, df_customers, df_transactions = (
+        pd.read_csv(os.path.join(data_dir, f'{table}.csv')) for table in RAW_TABLES)
+    if start is not None or end is not None:
+        dates = df_transactions['transaction_date']
+        keep = pd.Series(True, index=dates.index)
+        if start is not None:
+            keep &= dates >= start
+        if end is not None:
+            keep &= dates < end
+        df_transactions = df_transactions[keep].reset_index(drop=True)
+    return df_products, df_stores, df_customers, df_transactions
 
-cohort_data['period_number'] = (cohort_data['order_month'] - cohort_data['cohort']).apply(lambda x: x.n)
 
-cohort_pivot = cohort_data.pivot_table(index='cohort', columns='period_number', values='customer_id')
+def load_warehouse_data(start=None, end=None, method='copy'):
+    # the same four frames streamed out of PostgreSQL; psycopg2 is only needed for this source
+    from postgres_source import read_tables
+    return read_tables(start=start, end=end, method=method)
 
-print("  Cohort retention table created")
-print(f"  Cohorts tracked: {len(cohort_pivot)}")
 
-# Product Affinity Analysis
-print("\n Product Basket Analysis...")
+def assess_data_quality(df, name, chunksize=100_000, verbose=True):
+    # profile in chunks so the same code path works on files too big to load at once
+    profiler = StreamingProfiler(name, expected_rows=len(df))
+    for start in range(0, len(df), chunksize):
+        profiler.update(df.iloc[start:start + chunksize])
+    if verbose:
+        profiler.print_report()
+    return profiler
 
-# Find products frequently bought together
-basket = df_transactions.groupby(['customer_id', 'transaction_date'])['product_id'].apply(list).reset_index()
-basket['basket_size'] = basket['product_id'].apply(len)
-
-print(f"  Average basket size: {basket['basket_size'].mean():.2f} items")
-print(f"  Transactions with multiple items: {(basket['basket_size'] > 1).sum()}")
-
-
-
-
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime
-import warnings
-warnings.filterwarnings('ignore')
-
-
-df_products = pd.read_csv('products.csv')
-df_stores = pd.read_csv('stores.csv')
-df_customers = pd.read_csv('customers.csv')
-df_transactions = pd.read_csv('transactions.csv')
-
-
-def assess_data_quality(df, name):
-    print(f"\n{name} Table:")
-    print(f"  Shape: {df.shape}")
-    print(f"  Missing Values:")
-    missing = df.isnull().sum()
-    if missing.sum() > 0:
-        print(missing[missing > 0])
-    else:
-        print("    None")
-    
-    print(f"  Duplicates: {df.duplicated().sum()}")
-    print(f"  Memory Usage: {df.memory_usage(deep=True).sum() / 1024**2:.2f} MB")
-
-assess_data_quality(df_products, "PRODUCTS")
-assess_data_quality(df_stores, "STORES")
-assess_data_quality(df_customers, "CUSTOMERS")
-assess_data_quality(df_transactions, "TRANSACTIONS")
 
 # data cleaning
-# check for nulls in critical columns
-critical_cols_transactions = ['transaction_id', 'transaction_date', 'product_id', 
-                               'store_id', 'customer_id', 'total_amount']
-
-for col in critical_cols_transactions:
-    null_count = df_transactions[col].isnull().sum()
-    if null_count > 0:
-        print(f" {col}: {null_count} missing values")
-    else:
-        print(f"  {col}: No missing values")
-
-# filling missing discount values with 0
-df_transactions['discount_pct'] = df_transactions['discount_pct'].fillna(0)
-df_transactions['discount_amount'] = df_transactions['discount_amount'].fillna(0)
-
-# removing duplicates
-initial_count = len(df_transactions)
-df_transactions = df_transactions.drop_duplicates(subset=['transaction_id'])
-removed = initial_count - len(df_transactions)
-print(f"  Removed {removed} duplicate transactions")
-
-# data type conversion
-df_transactions['transaction_date'] = pd.to_datetime(df_transactions['transaction_date'])
-df_stores['opened_date'] = pd.to_datetime(df_stores['opened_date'])
-df_customers['join_date'] = pd.to_datetime(df_customers['join_date'])
-
-
-def detect_outliers(df, column):
-    Q1 = df[column].quantile(0.25)
-    Q3 = df[column].quantile(0.75)
-    IQR = Q3 - Q1
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
+def clean_transactions(df_transactions):
+    # filling missing discount values with 0
+    df_transactions['discount_pct'] = df_transactions['discount_pct'].fillna(0)
+    df_transactions['discount_amount'] = df_transactions['discount_amount'].fillna(0)
+
+    # removing duplicates
+    initial_count = len(df_transactions)
+    df_transactions = df_transactions.drop_duplicates(subset=['transaction_id'])
+    removed = initial_count - len(df_transactions)
+    return df_transactions, removed
+
+
+def convert_types(df_transactions=None, df_stores=None, df_customers=None):
+    # data type conversion, in place; any of the frames may be left out
+    for df, column in [(df_transactions, 'transaction_date'), (df_stores, 'opened_date'),
+                       (df_customers, 'join_date')]:
+        if df is not None:
+            df[column] = pd.to_datetime(df[column])
+    return df_transactions, df_stores, df_customers
+
+
+def detect_outliers(df, column, profiler=None):
+    # IQR bounds come from the profiler's quantile sketch instead of sorting the column
+    if profiler is None:
+        profiler = StreamingProfiler(column, expected_rows=len(df)).update(df[[column]])
+    lower_bound, upper_bound = profiler.iqr_bounds(column)
     outliers = df[(df[column] < lower_bound) | (df[column] > upper_bound)]
     return outliers, lower_bound, upper_bound
 
-outliers, lower, upper = detect_outliers(df_transactions, 'total_amount')
-print(f"  Total Amount Outliers: {len(outliers)} transactions")
-print(f"  Bounds: [{lower:.2f}, {upper:.2f}]")
-
-# Validating Business Logic
-# Check for negative values
-negative_checks = {
-    'quantity': (df_transactions['quantity'] < 0).sum(),
-    'total_amount': (df_transactions['total_amount'] < 0).sum(),
-    'profit': (df_transactions['profit'] < 0).sum()
-}
 
-for field, count in negative_checks.items():
-    if count > 0:
-        print(f" {field}: {count} negative values")
-    else:
-        print(f" {field}: No negative values")
+def validate_transactions(df_transactions, df_products, df_stores, df_customers):
+    # null, negative-value, profit identity and foreign-key rules in one pass
+    rule_engine = RuleEngine(transaction_rules(df_products, df_stores, df_customers))
+    return rule_engine.validate(df_transactions).results()
 
-# Validating profit calculation
-df_transactions['calculated_profit'] = df_transactions['total_amount'] - df_transactions['total_cost']
-profit_mismatch = abs(df_transactions['profit'] - df_transactions['calculated_profit']) > 0.01
-print(f"  Profit calculation mismatches: {profit_mismatch.sum()}")
 
 # data transformation
-# creating time-based features
-
-df_transactions['year'] = df_transactions['transaction_date'].dt.year
-df_transactions['month'] = df_transactions['transaction_date'].dt.month
-df_transactions['month_name'] = df_transactions['transaction_date'].dt.month_name()
-df_transactions['quarter'] = df_transactions['transaction_date'].dt.quarter
-df_transactions['day_of_week'] = df_transactions['transaction_date'].dt.dayofweek
-df_transactions['day_name'] = df_transactions['transaction_date'].dt.day_name()
-df_transactions['week_of_year'] = df_transactions['transaction_date'].dt.isocalendar().week
-df_transactions['is_weekend'] = df_transactions['day_of_week'].isin([5, 6]).astype(int)
-
-# Creating season
 def get_season(month):
     if month in [12, 1, 2]:
         return 'Winter'
@@ -444,23 +108,7 @@ def get_season(month):
     else:
         return 'Fall'
 
-df_transactions['season'] = df_transactions['month'].apply(get_season)
 
-
-# Profit margin percentage
-df_transactions['profit_margin_pct'] = (
-    df_transactions['profit'] / df_transactions['total_amount'] * 100
-).round(2)
-
-# Discount effectiveness
-df_transactions['discount_given'] = (df_transactions['discount_pct'] > 0).astype(int)
-
-# Revenue per unit
-df_transactions['revenue_per_unit'] = (
-    df_transactions['total_amount'] / df_transactions['quantity']
-).round(2)
-
-# Transaction size category
 def categorize_transaction(amount):
     if amount < 50:
         return 'Small'
@@ -471,44 +119,56 @@ def categorize_transaction(amount):
     else:
         return 'Very Large'
 
-df_transactions['transaction_size'] = df_transactions['total_amount'].apply(categorize_transaction)
 
-# Customer features
-# Customer lifetime value
-customer_ltv = df_transactions.groupby('customer_id').agg({
-    'total_amount': 'sum',
-    'transaction_id': 'count',
-    'transaction_date': ['min', 'max']
-}).reset_index()
+def add_transaction_features(df_transactions):
+    # creating time-based features
+    df_transactions['year'] = df_transactions['transaction_date'].dt.year
+    df_transactions['month'] = df_transactions['transaction_date'].dt.month
+    df_transactions['month_name'] = df_transactions['transaction_date'].dt.month_name()
+    df_transactions['quarter'] = df_transactions['transaction_date'].dt.quarter
+    df_transactions['day_of_week'] = df_transactions['transaction_date'].dt.dayofweek
+    df_transactions['day_name'] = df_transactions['transaction_date'].dt.day_name()
+    df_transactions['week_of_year'] = df_transactions['transaction_date'].dt.isocalendar().week
+    df_transactions['is_weekend'] = df_transactions['day_of_week'].isin([5, 6]).astype(int)
+
+    # Creating season
+    df_transactions['season'] = df_transactions['month'].apply(get_season)
 
-customer_ltv.columns = ['customer_id', 'lifetime_value', 'transaction_count', 'first_purchase', 'last_purchase']
-customer_ltv['customer_tenure_days'] = (customer_ltv['last_purchase'] - customer_ltv['first_purchase']).dt.days
-customer_ltv['avg_order_value'] = customer_ltv['lifetime_value'] / customer_ltv['transaction_count']
+    # Profit margin percentage
+    df_transactions['profit_margin_pct'] = (
+        df_transactions['profit'] / df_transactions['total_amount'] * 100
+    ).round(2)
 
-# Merge back to customers
-df_customers = df_customers.merge(customer_ltv[['customer_id', 'lifetime_value', 'transaction_count', 
-                                                  'customer_tenure_days', 'avg_order_value']], 
-                                   on='customer_id', how='left')
+    # Discount effectiveness
+    df_transactions['discount_given'] = (df_transactions['discount_pct'] > 0).astype(int)
 
-print("  ✓ Created: lifetime_value, transaction_count, customer_tenure_days, avg_order_value")
+    # Revenue per unit
+    df_transactions['revenue_per_unit'] = (
+        df_transactions['total_amount'] / df_transactions['quantity']
+    ).round(2)
 
-# Creating Product features
-# Product performance metrics
-product_metrics = df_transactions.groupby('product_id').agg({
-    'quantity': 'sum',
-    'total_amount': 'sum',
-    'profit': 'sum',
-    'transaction_id': 'count'
-}).reset_index()
+    # Transaction size category
+    df_transactions['transaction_size'] = df_transactions['total_amount'].apply(categorize_transaction)
+    return df_transactions
 
-product_metrics.columns = ['product_id', 'total_units_sold', 'total_revenue', 'total_profit', 'num_sales']
-product_metrics['avg_profit_per_sale'] = product_metrics['total_profit'] / product_metrics['num_sales']
 
-df_products = df_products.merge(product_metrics, on='product_id', how='left')
+def add_customer_features(df_customers, df_transactions):
+    # Customer lifetime value
+    customer_ltv = df_transactions.groupby('customer_id').agg({
+        'total_amount': 'sum',
+        'transaction_id': 'count',
+        'transaction_date': ['min', 'max']
+    }).reset_index()
+
+    customer_ltv.columns = ['customer_id', 'lifetime_value', 'transaction_count', 'first_purchase', 'last_purchase']
+    customer_ltv['customer_tenure_days'] = (customer_ltv['last_purchase'] - customer_ltv['first_purchase']).dt.days
+    customer_ltv['avg_order_value'] = customer_ltv['lifetime_value'] / customer_ltv['transaction_count']
+
+    # Merge back to customers
+    return df_customers.merge(customer_ltv[['customer_id', 'lifetime_value', 'transaction_count',
+                                            'customer_tenure_days', 'avg_order_value']],
+                              on='customer_id', how='left')
 
-# Product margin category
-df_products['margin_pct'] = ((df_products['unit_price'] - df_products['unit_cost']) / 
-                              df_products['unit_price'] * 100).round(2)
 
 def categorize_margin(margin):
     if margin < 30:
@@ -518,142 +178,291 @@ def categorize_margin(margin):
     else:
         return 'High Margin'
 
-df_products['margin_category'] = df_products['margin_pct'].apply(categorize_margin)
-
-print("  ✓ Created: total_units_sold, total_revenue, margin_category")
-
-# Creating store features
-# Store performance metrics
-store_metrics = df_transactions.groupby('store_id').agg({
-    'total_amount': 'sum',
-    'profit': 'sum',
-    'transaction_id': 'count',
-    'customer_id': 'nunique'
-}).reset_index()
-
-store_metrics.columns = ['store_id', 'total_revenue', 'total_profit', 'num_transactions', 'unique_customers']
-store_metrics['revenue_per_transaction'] = store_metrics['total_revenue'] / store_metrics['num_transactions']
-store_metrics['revenue_per_customer'] = store_metrics['total_revenue'] / store_metrics['unique_customers']
-
-df_stores = df_stores.merge(store_metrics, on='store_id', how='left')
-
-print("  ✓ Created: total_revenue, revenue_per_transaction, unique_customers")
-
-# 4.6 Create Master Analytical Dataset
-print("\n4.6 Creating Master Analytical Dataset...")
-
-df_master = df_transactions.merge(df_products[['product_id', 'product_name', 'category', 'margin_category']], 
-                                   on='product_id', how='left')
-df_master = df_master.merge(df_stores[['store_id', 'store_name', 'region', 'city']], 
-                             on='store_id', how='left')
-df_master = df_master.merge(df_customers[['customer_id', 'customer_segment', 'lifetime_value']], 
-                             on='customer_id', how='left')
-
-
-# Data Analytics
-# Descriptive Statistics
-print("\n Transaction Summary Statistics:")
-summary_stats = df_transactions[['quantity', 'total_amount', 'profit', 'profit_margin_pct']].describe()
-print(summary_stats)
-
-# Revenue Analysis
-print("\n Revenue Breakdown:")
-print(f"  Total Revenue: ${df_transactions['total_amount'].sum():,.2f}")
-print(f"  Total Profit: ${df_transactions['profit'].sum():,.2f}")
-print(f"  Average Transaction Value: ${df_transactions['total_amount'].mean():.2f}")
-print(f"  Median Transaction Value: ${df_transactions['total_amount'].median():.2f}")
-print(f"  Overall Profit Margin: {(df_transactions['profit'].sum() / df_transactions['total_amount'].sum() * 100):.2f}%")
 
-# Time-based Analysis
-print("\n Temporal Patterns:")
-yearly_sales = df_transactions.groupby('year')['total_amount'].sum()
-print("\nRevenue by Year:")
-print(yearly_sales)
+def add_product_features(df_products, df_transactions):
+    # Product performance metrics
+    product_metrics = df_transactions.groupby('product_id').agg({
+        'quantity': 'sum',
+        'total_amount': 'sum',
+        'profit': 'sum',
+        'transaction_id': 'count'
+    }).reset_index()
 
-monthly_avg = df_transactions.groupby('month_name')['total_amount'].mean().sort_values(ascending=False)
-print("\nTop 3 Months by Avg Transaction Value:")
-print(monthly_avg.head(3))
+    product_metrics.columns = ['product_id', 'total_units_sold', 'total_revenue', 'total_profit', 'num_sales']
+    product_metrics['avg_profit_per_sale'] = product_metrics['total_profit'] / product_metrics['num_sales']
 
-# Category Performance
-print("\n Category Performance:")
-category_perf = df_master.groupby('category').agg({
-    'total_amount': 'sum',
-    'profit': 'sum',
-    'transaction_id': 'count'
-}).round(2)
-category_perf.columns = ['Revenue', 'Profit', 'Transactions']
-category_perf = category_perf.sort_values('Revenue', ascending=False)
-print(category_perf)
+    df_products = df_products.merge(product_metrics, on='product_id', how='left')
 
-# Regional Performance
-print("\n Regional Performance:")
-regional_perf = df_master.groupby('region').agg({
-    'total_amount': 'sum',
-    'profit': 'sum',
-    'transaction_id': 'count'
-}).round(2)
-regional_perf.columns = ['Revenue', 'Profit', 'Transactions']
-print(regional_perf)
+    # Product margin category
+    df_products['margin_pct'] = ((df_products['unit_price'] - df_products['unit_cost']) /
+                                 df_products['unit_price'] * 100).round(2)
+    df_products['margin_category'] = df_products['margin_pct'].apply(categorize_margin)
+    return df_products
 
-# Customer Segment Analysis
-print("\n Customer Segment Analysis:")
-segment_analysis = df_master.groupby('customer_segment').agg({
-    'customer_id': 'nunique',
-    'total_amount': ['sum', 'mean'],
-    'profit': 'sum'
-}).round(2)
-print(segment_analysis)
 
+def add_store_features(df_stores, df_transactions):
+    # Store performance metrics
+    store_metrics = df_transactions.groupby('store_id').agg({
+        'total_amount': 'sum',
+        'profit': 'sum',
+        'transaction_id': 'count',
+        'customer_id': 'nunique'
+    }).reset_index()
 
-# RFM Analysis (Recency, Frequency, Monetary)
-print("\n RFM Analysis...")
-
-analysis_date = df_transactions['transaction_date'].max() + pd.Timedelta(days=1)
-
-rfm = df_transactions.groupby('customer_id').agg({
-    'transaction_date': lambda x: (analysis_date - x.max()).days,  # Recency
-    'transaction_id': 'count',  # Frequency
-    'total_amount': 'sum'  # Monetary
-}).reset_index()
-
-rfm.columns = ['customer_id', 'recency', 'frequency', 'monetary']
-
-# Create RFM scores
-rfm['r_score'] = pd.qcut(rfm['recency'], 4, labels=[4, 3, 2, 1])
-rfm['f_score'] = pd.qcut(rfm['frequency'].rank(method='first'), 4, labels=[1, 2, 3, 4])
-rfm['m_score'] = pd.qcut(rfm['monetary'], 4, labels=[1, 2, 3, 4])
-
-rfm['rfm_score'] = rfm['r_score'].astype(str) + rfm['f_score'].astype(str) + rfm['m_score'].astype(str)
-
-print("  RFM Segments Distribution:")
-print(rfm['rfm_score'].value_counts().head(10))
-
-# Cohort Analysis
-print("\n6.2 Cohort Analysis...")
-
-df_transactions['order_month'] = df_transactions['transaction_date'].dt.to_period('M')
-df_transactions['cohort'] = df_transactions.groupby('customer_id')['transaction_date'].transform('min').dt.to_period('M')
-
-cohort_data = df_transactions.groupby(['cohort', 'order_month']).agg({
-    'customer_id': 'nunique'
-}).reset_index()
-
-cohort_data['period_number'] = (cohort_data['order_month'] - cohort_data['cohort']).apply(lambda x: x.n)
-
-cohort_pivot = cohort_data.pivot_table(index='cohort', columns='period_number', values='customer_id')
-
-print("  Cohort retention table created")
-print(f"  Cohorts tracked: {len(cohort_pivot)}")
-
-# Product Affinity Analysis
-print("\n6.3 Product Basket Analysis...")
-
-# Find products frequently bought together
-basket = df_transactions.groupby(['customer_id', 'transaction_date'])['product_id'].apply(list).reset_index()
-basket['basket_size'] = basket['product_id'].apply(len)
-
-print(f"  Average basket size: {basket['basket_size'].mean():.2f} items")
-print(f"  Transactions with multiple items: {(basket['basket_size'] > 1).sum()}")
+    store_metrics.columns = ['store_id', 'total_revenue', 'total_profit', 'num_transactions', 'unique_customers']
+    store_metrics['revenue_per_transaction'] = store_metrics['total_revenue'] / store_metrics['num_transactions']
+    store_metrics['revenue_per_customer'] = store_metrics['total_revenue'] / store_metrics['unique_customers']
 
+    return df_stores.merge(store_metrics, on='store_id', how='left')
 
 
+# Data Analytics
+def build_aggregates(df_master, df_products, df_stores):
+    # Aggregate once; the breakdowns below are rolled up from the cube
+    return SalesCube.build(df_master, df_products, df_stores), TimeRollupStore.build(df_master)
+
+
+def summary_statistics(df_transactions):
+    return df_transactions[['quantity', 'total_amount', 'profit', 'profit_margin_pct']].describe()
+
+
+def revenue_breakdown(df_transactions):
+    return {
+        'total_revenue': df_transactions['total_amount'].sum(),
+        'total_profit': df_transactions['profit'].sum(),
+        'avg_transaction': df_transactions['total_amount'].mean(),
+        'median_transaction': df_transactions['total_amount'].median(),
+        'profit_margin': df_transactions['profit'].sum() / df_transactions['total_amount'].sum() * 100,
+    }
+
+
+def temporal_patterns(time_rollups):
+    yearly_sales = time_rollups.calendar('year')['total_amount']
+    monthly_totals = time_rollups.calendar('month_name')
+    monthly_avg = (monthly_totals['total_amount'] / monthly_totals['transaction_count']).sort_values(ascending=False)
+    return yearly_sales, monthly_avg
+
+
+def category_performance(sales_cube):
+    category_perf = sales_cube.rollup('category')[['total_amount', 'profit', 'transaction_count']].round(2)
+    category_perf.columns = ['Revenue', 'Profit', 'Transactions']
+    return category_perf.sort_values('Revenue', ascending=False)
+
+
+def regional_performance(sales_cube):
+    regional_perf = sales_cube.rollup('region')[['total_amount', 'profit', 'transaction_count']].round(2)
+    regional_perf.columns = ['Revenue', 'Profit', 'Transactions']
+    return regional_perf
+
+
+def segment_analysis(sales_cube, df_customers):
+    # unique customers are not additive, so they come from the customer table
+    segments = sales_cube.rollup('customer_segment')[['total_amount', 'avg_transaction', 'profit']]
+    segments.insert(0, 'customers', df_customers[df_customers['transaction_count'] > 0]
+                    .groupby('customer_segment')['customer_id'].count())
+    return segments.round(2)
+
+
+def cross_sell_rules(df_transactions, df_products, min_support=0.0001, max_len=3):
+    # Find products frequently bought together; scipy is only needed here
+    from basket_mining import basket_matrix, frequent_itemsets, association_rules
+
+    basket_X, basket_items, basket_sizes = basket_matrix(df_transactions)
+    cross_sell = association_rules(frequent_itemsets(basket_X, min_support=min_support, max_len=max_len),
+                                   basket_X.shape[0], basket_items)
+    if len(cross_sell):
+        product_names = df_products.set_index('product_id')['product_name']
+        cross_sell['antecedent'] = [tuple(product_names[list(a)]) for a in cross_sell['antecedent']]
+        cross_sell['consequent'] = product_names[cross_sell['consequent']].to_numpy()
+    return cross_sell, basket_sizes
+
+
+def save_cleaned_data(frames, output_dir='.'):
+    # frames: {'transactions': ..., 'master': ..., ...} keyed like CLEANED_FILES
+    paths = {}
+    for key, filename in CLEANED_FILES.items():
+        paths[key] = os.path.join(output_dir, filename)
+        frames[key].to_csv(paths[key], index=False)
+    return paths
+
+
+def save_zoned_master(df_master, output_dir='.'):
+    # month/store-clustered blocks with min/max zone maps, for time-range and store scans
+    return ZonedTable.write(df_master, os.path.join(output_dir, STORE_DIR))
+
+
+def run_pipeline(data_dir='.', output_dir='.', tracer=None, verbose=True, save=True, backend='pandas',
+                 source='csv', start=None, end=None):
+    # per-stage timings/memory are only recorded when a tracer is passed in
+    tracer = tracer or PipelineTracer(enabled=False)
+    # dedup, features, metrics, master join, RFM and cohorts run on the chosen backend
+    engine = get_backend(backend)
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    # each stage reports the DataFrames it produced through the dict the with-block yields
+    with tracer.stage('load') as produced:
+        if source == 'postgres':
+            df_products, df_stores, df_customers, df_transactions = load_warehouse_data(start, end)
+        else:
+            df_products, df_stores, df_customers, df_transactions = load_raw_data(data_dir, start, end)
+        produced.update(products=df_products, stores=df_stores, customers=df_customers,
+                        transactions=df_transactions)
+
+    with tracer.stage('quality_check'):
+        assess_data_quality(df_products, "PRODUCTS", verbose=verbose)
+        assess_data_quality(df_stores, "STORES", verbose=verbose)
+        assess_data_quality(df_customers, "CUSTOMERS", verbose=verbose)
+        # the transactions profile also supplies the outlier bounds, so total_amount is sketched only once
+        transactions_profile = assess_data_quality(df_transactions, "TRANSACTIONS", verbose=verbose)
+
+    with tracer.stage('dedup') as produced:
+        df_transactions, removed = engine.dedup(df_transactions)
+        log(f"  Removed {removed} duplicate transactions")
+        produced.update(transactions=df_transactions)
+
+    with tracer.stage('type_conversion') as produced:
+        df_transactions = engine.convert_types(df_transactions)
+        convert_types(df_stores=df_stores, df_customers=df_customers)
+        produced.update(transactions=df_transactions, stores=df_stores, customers=df_customers)
+
+    with tracer.stage('validation') as produced:
+        outliers, lower, upper = detect_outliers(df_transactions, 'total_amount', transactions_profile)
+        log(f"  Total Amount Outliers: {len(outliers)} transactions")
+        log(f"  Bounds: [{lower:.2f}, {upper:.2f}]")
+
+        validation_results = validate_transactions(df_transactions, df_products, df_stores, df_customers)
+        for _, result in validation_results.iterrows():
+            if result['violations'] > 0:
+                log(f" {result['rule']}: {result['violations']} violations (e.g. transaction_id {result['sample_ids']})")
+            else:
+                log(f"  {result['rule']}: OK")
+        produced.update(outliers=outliers, validation_results=validation_results)
+
+    with tracer.stage('feature_engineering') as produced:
+        df_transactions = engine.transaction_features(df_transactions)
+        produced.update(transactions=df_transactions)
+
+    with tracer.stage('metrics') as produced:
+        df_customers = engine.customer_features(df_customers, df_transactions)
+        log(" Created: lifetime_value, transaction_count, customer_tenure_days, avg_order_value")
+        df_products = engine.product_features(df_products, df_transactions)
+        log("  ✓ Created: total_units_sold, total_revenue, margin_category")
+        df_stores = engine.store_features(df_stores, df_transactions)
+        log(" Created: total_revenue, revenue_per_transaction, unique_customers")
+        produced.update(customers=df_customers, products=df_products, stores=df_stores)
+
+    # Create Master Analytical Dataset
+    log("\n Creating Master Analytical Dataset...")
+    with tracer.stage('master_join') as produced:
+        df_master = engine.master(df_transactions, df_products, df_stores, df_customers)
+        produced.update(master=df_master)
+
+    with tracer.stage('aggregates') as produced:
+        sales_cube, time_rollups = build_aggregates(df_master, df_products, df_stores)
+        produced.update(cube_cells=sales_cube.cells, daily_rollup=time_rollups.levels['daily'])
+
+    # Descriptive Statistics
+    log("\n Transaction Summary Statistics:")
+    log(summary_statistics(df_transactions))
+
+    # Revenue Analysis
+    revenue = revenue_breakdown(df_transactions)
+    log("\n Revenue Breakdown:")
+    log(f"  Total Revenue: ${revenue['total_revenue']:,.2f}")
+    log(f"  Total Profit: ${revenue['total_profit']:,.2f}")
+    log(f"  Average Transaction Value: ${revenue['avg_transaction']:.2f}")
+    log(f"  Median Transaction Value: ${revenue['median_transaction']:.2f}")
+    log(f"  Overall Profit Margin: {revenue['profit_margin']:.2f}%")
+
+    # Time-based Analysis
+    log("\n Temporal Patterns:")
+    yearly_sales, monthly_avg = temporal_patterns(time_rollups)
+    log("\nRevenue by Year:")
+    log(yearly_sales)
+    log("\nTop 3 Months by Avg Transaction Value:")
+    log(monthly_avg.head(3))
+
+    log("\n Category Performance:")
+    category_perf = category_performance(sales_cube)
+    log(category_perf)
+
+    log("\n Regional Performance:")
+    regional_perf = regional_performance(sales_cube)
+    log(regional_perf)
+
+    log("\n Customer Segment Analysis:")
+    segments = segment_analysis(sales_cube, df_customers)
+    log(segments)
+
+    # RFM Analysis (Recency, Frequency, Monetary)
+    log("\n RFM Analysis...")
+    with tracer.stage('rfm') as produced:
+        rfm = engine.rfm(df_transactions)
+        produced.update(rfm=rfm)
+    log("  RFM Segments Distribution:")
+    log(rfm['rfm_score'].value_counts().head(10))
+
+    # Cohort Analysis
+    log("\n Cohort Analysis...")
+    with tracer.stage('cohort') as produced:
+        cohort_counts, cohort_pct = engine.cohorts(df_transactions)
+        produced.update(cohort_counts=cohort_counts, cohort_pct=cohort_pct)
+    log("  Cohort retention table created")
+    log(f"  Cohorts tracked: {len(cohort_counts)}")
+
+    # Product Affinity Analysis
+    log("\n Product Basket Analysis...")
+    with tracer.stage('basket') as produced:
+        cross_sell, basket_sizes = cross_sell_rules(df_transactions, df_products)
+        produced.update(cross_sell=cross_sell)
+    log(f"  Average basket size: {basket_sizes.mean():.2f} items")
+    log(f"  Transactions with multiple items: {(basket_sizes > 1).sum()}")
+    if len(cross_sell):
+        log("  Top cross-sell rules:")
+        log(cross_sell.sort_values(['lift', 'count'], ascending=False).head(10).to_string(index=False))
+
+    frames = {'transactions': df_transactions, 'master': df_master, 'products': df_products,
+              'customers': df_customers, 'stores': df_stores}
+    if save:
+        # Save cleaned datasets (inputs of visualizations.py)
+        log("\n Saving Cleaned Datasets...")
+        with tracer.stage('save'):
+            for key, path in save_cleaned_data(frames, output_dir).items():
+                log(f"  ✓ Saved: {os.path.basename(path)} ({len(frames[key]):,} rows)")
+            zoned = save_zoned_master(frames['master'], output_dir)
+            log(f"  ✓ Saved: {STORE_DIR}/ ({len(zoned.zones)} month/store-clustered block(s) with zone maps)")
+
+    return dict(frames, sales_cube=sales_cube, time_rollups=time_rollups, validation=validation_results,
+                outliers=outliers, revenue=revenue, yearly_sales=yearly_sales, monthly_avg=monthly_avg,
+                category_performance=category_perf, regional_performance=regional_perf,
+                segment_analysis=segments, rfm=rfm, cohort_counts=cohort_counts, cohort_pct=cohort_pct,
+                cross_sell=cross_sell)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Clean, enrich and analyse the raw retail CSVs')
+    parser.add_argument('--data-dir', default='.', help='directory with the raw CSVs')
+    parser.add_argument('--output-dir', default='.', help='directory for the cleaned CSVs')
+    parser.add_argument('--quiet', action='store_true', help='do not print the analysis report')
+    parser.add_argument('--no-save', action='store_true', help='do not write the cleaned CSVs')
+    parser.add_argument('--backend', default='pandas', choices=list(BACKENDS),
+                        help='engine for the transaction stages (polars and duckdb must be installed)')
+    parser.add_argument('--source', default='csv', choices=SOURCES,
+                        help='read the raw CSVs or stream the warehouse tables (PG* variables select the database)')
+    parser.add_argument('--start', help='first transaction date to include (YYYY-MM-DD)')
+    parser.add_argument('--end', help='first transaction date to leave out (YYYY-MM-DD)')
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings('ignore')
+    # per-stage timings/memory, enabled with PIPELINE_TRACE / PIPELINE_PROFILE
+    tracer = PipelineTracer.from_env()
+    try:
+        run_pipeline(args.data_dir, args.output_dir, tracer, verbose=not args.quiet, save=not args.no_save,
+                     backend=args.backend, source=args.source, start=args.start, end=args.end)
+    finally:
+        # a failed run still leaves the trace of the stages up to and including the one that failed
+        tracer.save()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# KLL quantile sketch: a stack of compactors where an item at level h stands
+# for 2**h original values. Memory stays around 3*k items whatever the input size.
+class KLLSketch:
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+
+    def _compress(self):
+        # keep compacting until every level fits; adding a level shrinks
+        # the capacities below it, so one sweep is not always enough
+        compacted = True
+        while compacted:
+            compacted = False
+            for level in range(len(self.levels)):
+                items = self.levels[level]
+                if len(items) <= self._capacity(level):
+                    continue
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = items[:len(items) % 2]
+                items = items[len(items) % 2:]
+                offset = self._rng.integers(2)
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset::2]])
+                self.levels[level] = keep
+                compacted = True
+
+    def quantile(self, q):
+        if self.n == 0:
+            return np.nan
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level)
+                                  for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values = values[order]
+        cum_weights = np.cumsum(weights[order])
+        idx = np.searchsorted(cum_weights, np.asarray(q) * cum_weights[-1], side='left')
+        return values[np.minimum(idx, len(values) - 1)]
+
+    def size(self):
+        return sum(len(items) for items in self.levels)
+
+
+# set bits per byte value, for counting the filled bits without unpacking them
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class _BloomLayer:
+    def __init__(self, capacity, fp_rate):
+        # optimal size and hash count for `capacity` values at `fp_rate`
+        bits = -capacity * math.log(fp_rate) / math.log(2) ** 2
+        self.bits = min(max(math.ceil(bits / 8), 8), 2**29 - 1) * 8
+        self.hashes = max(1, round(-math.log2(fp_rate)))
+        self.capacity = capacity
+        self.count = 0
+        self.array = np.zeros(self.bits // 8, dtype=np.uint8)
+
+    def _positions(self, values):
+        # double hashing: hash i = h1 + i * h2 (32 bits), mapped onto the bits by multiply-shift
+        h1 = values & np.uint64(0xFFFFFFFF)
+        h2 = (values >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        hashes = (h1[:, None] + steps * h2[:, None]) & np.uint64(0xFFFFFFFF)
+        positions = (hashes * np.uint64(self.bits)) >> np.uint64(32)
+        return positions >> np.uint64(3), (positions & np.uint64(7)).astype(np.uint8)
+
+    def contains(self, values):
+        byte, bit = self._positions(values)
+        return ((self.array[byte] >> bit) & 1).all(axis=1)
+
+    def add(self, values):
+        byte, bit = self._positions(values)
+        np.bitwise_or.at(self.array, byte.ravel(), np.left_shift(np.uint8(1), bit.ravel()))
+        self.count += len(values)
+
+    def false_positive_rate(self):
+        filled = int(_POPCOUNT[self.array].sum()) / self.bits
+        return filled ** self.hashes
+
+
+# Scalable Bloom filter over 64-bit hashes. The first layer is sized for
+# `capacity` values at half the target false-positive rate; once it is full a
+# layer twice as large with half the rate is added, and so on, so the overall
+# rate stays below `fp_rate` however many values arrive. A value can be
+# reported as seen when it was not, never the other way round.
+class HashFilter:
+    def __init__(self, capacity=100_000, fp_rate=0.001):
+        self.fp_rate = fp_rate
+        self.layers = [_BloomLayer(max(int(capacity), 1), fp_rate / 2)]
+
+    def add(self, values):
+        # marks the values as seen; returns which of them were (probably) seen before
+        seen = np.zeros(len(values), dtype=bool)
+        for layer in self.layers:
+            seen |= layer.contains(values)
+        new = values[~seen]
+        while len(new):
+            layer = self.layers[-1]
+            room = layer.capacity - layer.count
+            if room <= 0:
+                self.layers.append(_BloomLayer(layer.capacity * 2, self.fp_rate / 2 ** (len(self.layers) + 1)))
+                continue
+            layer.add(new[:room])
+            new = new[room:]
+        return seen
+
+    def false_positive_rate(self):
+        # current chance that a new distinct value is reported as seen
+        return float(1 - np.prod([1 - layer.false_positive_rate() for layer in self.layers]))
+
+    def nbytes(self):
+        return sum(layer.array.nbytes for layer in self.layers)
+
+
+# Duplicate rows by 64-bit row hash. The distinct hashes are kept exactly, as
+# sorted runs merged like a binary counter (each chunk costs O(chunk log n)),
+# until they reach max_exact; from then on they go into a HashFilter sized for
+# at least twice as many rows, which bounds the memory and makes the count an
+# upper estimate with a known false-positive rate.
+class DuplicateCounter:
+    def __init__(self, expected_rows=100_000, fp_rate=0.001, max_exact=2**23):
+        self.expected_rows = expected_rows
+        self.fp_rate = fp_rate
+        self.max_exact = max_exact
+        self.runs = []
+        self.distinct = 0
+        self.filter = None
+
+    @property
+    def exact(self):
+        return self.filter is None
+
+    def add(self, hashes):
+        # number of hashes already seen, in earlier chunks or earlier in this one
+        if not self.exact:
+            seen_before = self.filter.add(hashes)
+            return int((seen_before | pd.Series(hashes).duplicated().to_numpy()).sum())
+
+        unique = np.unique(hashes)
+        seen = np.zeros(len(unique), dtype=bool)
+        for run in self.runs:
+            pos = np.searchsorted(run, unique).clip(max=len(run) - 1)
+            seen |= run[pos] == unique
+        run = unique[~seen]
+        self.distinct += len(run)
+        if len(run):
+            while self.runs and len(self.runs[-1]) <= len(run):
+                last = self.runs.pop()
+                run = np.insert(last, np.searchsorted(last, run), run)
+            self.runs.append(run)
+
+        if self.distinct > self.max_exact:
+            self.filter = HashFilter(max(self.expected_rows, 2 * self.distinct), self.fp_rate)
+            for run in self.runs:
+                for start in range(0, len(run), 100_000):
+                    self.filter.add(run[start:start + 100_000])
+            self.runs = []
+        return len(hashes) - int((~seen).sum())
+
+    def false_positive_rate(self):
+        return 0.0 if self.exact else self.filter.false_positive_rate()
+
+    def nbytes(self):
+        return sum(run.nbytes for run in self.runs) if self.exact else self.filter.nbytes()
+
+
+# Single-pass data-quality profiler. Feed it chunks (e.g. from
+# pd.read_csv(..., chunksize=...)) and read the report at the end.
+# Duplicates are counted on 64-bit row hashes (DuplicateCounter): exactly up
+# to max_exact distinct rows, approximately beyond, in which case the report
+# gives the false-positive rate. expected_rows sizes the filter when the row
+# count is known.
+class StreamingProfiler:
+    def __init__(self, name, k=200, seed=42, expected_rows=100_000, fp_rate=0.001, max_exact=2**23):
+        self.name = name
+        self.k = k
+        self.seed = seed
+        self.rows = 0
+        self.columns = None
+        self.null_counts = None
+        self.negative_counts = {}
+        self.sketches = {}
+        self.duplicates = 0
+        self.memory_bytes = 0
+        self._seen = DuplicateCounter(expected_rows, fp_rate, max_exact)
+
+    def update(self, chunk):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            self.null_counts = pd.Series(0, index=self.columns, dtype='int64')
+
+        self.rows += len(chunk)
+        self.null_counts = self.null_counts.add(chunk.isnull().sum(), fill_value=0).astype('int64')
+        self.memory_bytes += int(chunk.memory_usage(deep=True).sum())
+
+        # duplicates within the chunk plus rows already seen in earlier chunks
+        self.duplicates += self._seen.add(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+
+        for col in chunk.select_dtypes(include='number').columns:
+            values = chunk[col].to_numpy(dtype=float)
+            self.negative_counts[col] = self.negative_counts.get(col, 0) + int((values < 0).sum())
+            if col not in self.sketches:
+                self.sketches[col] = KLLSketch(self.k, seed=self.seed)
+            self.sketches[col].update(values)
+        return self
+
+    def quantile(self, column, q):
+        return self.sketches[column].quantile(q)
+
+    def iqr_bounds(self, column, whisker=1.5):
+        q1, q3 = self.quantile(column, [0.25, 0.75])
+        iqr = q3 - q1
+        return q1 - whisker * iqr, q3 + whisker * iqr
+
+    def report(self):
+        return {
+            'name': self.name,
+            'rows': self.rows,
+            'columns': len(self.columns or []),
+            'missing': {col: int(n) for col, n in self.null_counts.items() if n > 0},
+            'duplicates': self.duplicates,
+            'duplicates_exact': self._seen.exact,
+            # chance that a distinct row was counted as a duplicate (0 while the count is exact)
+            'duplicate_false_positive_rate': self._seen.false_positive_rate(),
+            'negatives': {col: n for col, n in self.negative_counts.items() if n > 0},
+            'memory_mb': self.memory_bytes / 1024**2,
+        }
+
+    def print_report(self):
+        report = self.report()
+        print(f"\n{self.name} Table:")
+        print(f"  Shape: ({report['rows']}, {report['columns']})")
+        print(f"  Missing Values:")
+        if report['missing']:
+            for col, n in report['missing'].items():
+                print(f"    {col}: {n}")
+        else:
+            print("    None")
+
+        if report['duplicates_exact']:
+            print(f"  Duplicates: {report['duplicates']}")
+        else:
+            print(f"  Duplicates: ≈{report['duplicates']} (FPR {report['duplicate_false_positive_rate']:.3%})")
+        print(f"  Memory Usage: {report['memory_mb']:.2f} MB")
+
+
+def profile_csv(path, name, chunksize=100_000, **read_csv_kwargs):
+    profiler = StreamingProfiler(name)
+    for chunk in pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs):
+        profiler.update(chunk)
+    return profiler
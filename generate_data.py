@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import os
 import random
 
 
@@ -10,7 +11,7 @@ random.seed(42)
 #setting the timeline
 START_DATE = datetime(2022, 1, 1)
 END_DATE = datetime(2024, 12, 31)
-NUM_TRANSACTIONS = 50000
+NUM_TRANSACTIONS = int(os.environ.get('RETAIL_NUM_TRANSACTIONS', 50000))
 
 categories = ['Electronics', 'Clothing', 'Home & Garden', 'Sports', 'Books', 'Toys', 'Food & Beverage']
 
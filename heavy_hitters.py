@@ -0,0 +1,252 @@
+import argparse
+import heapq
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# Streaming top-K products, customers and stores by revenue, quantity and
+# profit with weighted Space-Saving summaries. A summary holds at most
+# `capacity` counters; an unseen key takes over the smallest counter and
+# inherits its count as error. Every tracked estimate overstates the true
+# total by at most its error, which is at most total / capacity, and any key
+# that is not tracked has a true total of at most the smallest counter.
+# Summaries built on separate partitions merge into one with the same kind of
+# bound (the errors add up), so batches can be summarised independently.
+#
+# Space-Saving needs non-negative weights: 'profit' tracks the profit of
+# profitable transactions and 'loss' the loss of the others, each on its own.
+#
+# The capacity comes from an error target per dimension: with 1 / error
+# counters an estimate is off by at most error x total. Products and stores
+# are few and their totals far apart; customers are many and their totals
+# close together, so they get many more counters (with at least as many
+# counters as keys, a summary is exact). Only ranks the bounds can confirm are
+# reported as top sellers.
+CAPACITY = 500
+DIMENSIONS = ['product_id', 'customer_id', 'store_id']
+ERROR_TARGETS = {'product_id': 0.002, 'customer_id': 0.00005, 'store_id': 0.002}
+METRICS = ['revenue', 'quantity', 'profit', 'loss']
+STATE_FILE = 'heavy_hitters.json'
+
+
+def capacity_for(error):
+    # counters needed for estimates within error x total
+    return math.ceil(1 / error)
+
+
+CAPACITIES = {dimension: capacity_for(error) for dimension, error in ERROR_TARGETS.items()}
+
+
+def metric_weights(df, metric):
+    if metric == 'revenue':
+        return df['total_amount'].to_numpy(dtype=float)
+    if metric == 'quantity':
+        return df['quantity'].to_numpy(dtype=float)
+    if metric == 'profit':
+        return df['profit'].clip(lower=0).to_numpy(dtype=float)
+    if metric == 'loss':
+        return (-df['profit']).clip(lower=0).to_numpy(dtype=float)
+    raise ValueError(f"Unknown metric: {metric}")
+
+
+class SpaceSaving:
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0.0
+        # min-heap of (count, key); entries go stale when a count grows and are skipped lazily
+        self._heap = []
+
+    def _push(self, key):
+        heapq.heappush(self._heap, (self.counts[key], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _smallest(self):
+        while self._heap and self.counts.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0]
+
+    @property
+    def min_count(self):
+        # upper bound on the total of any key that is not tracked
+        if len(self.counts) < self.capacity:
+            return 0.0
+        return self._smallest()[0]
+
+    def update(self, key, weight=1.0):
+        if weight < 0:
+            raise ValueError("Space-Saving weights must be non-negative")
+        if weight == 0:
+            return
+        self.total += weight
+        if key in self.counts:
+            self.counts[key] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = weight
+            self.errors[key] = 0.0
+        else:
+            floor, evicted = self._smallest()
+            heapq.heappop(self._heap)
+            del self.counts[evicted], self.errors[evicted]
+            self.counts[key] = floor + weight
+            self.errors[key] = floor
+        self._push(key)
+
+    def update_many(self, keys, weights):
+        # a batch is summed per key first (one update per distinct key gives the same guarantees)
+        # and fed heaviest first, so the small keys churn through the smallest counter
+        batch = pd.Series(np.asarray(weights, dtype=float)).groupby(np.asarray(keys), sort=False).sum()
+        batch = batch.sort_values(ascending=False, kind='stable')
+        for key, weight in zip(batch.index.tolist(), batch.tolist()):
+            self.update(key, weight)
+        return self
+
+    def estimate(self, key):
+        # (upper bound, error): the true total lies in [upper - error, upper]
+        if key in self.counts:
+            return self.counts[key], self.errors[key]
+        return self.min_count, self.min_count
+
+    def top(self, n=10):
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        # a key is certainly in the true top n when its lower bound beats every other key's upper bound
+        threshold = ranked[n][1] if len(ranked) > n else self.min_count
+        rows = [(key, count, self.errors[key], count - self.errors[key]) for key, count in ranked[:n]]
+        result = pd.DataFrame(rows, columns=['key', 'estimate', 'error', 'lower_bound'])
+        result['guaranteed'] = result['lower_bound'] >= threshold
+        return result
+
+    def merge(self, other):
+        # keys missing from a full summary may have had up to its smallest count there
+        floor_a, floor_b = self.min_count, other.min_count
+        keys = set(self.counts) | set(other.counts)
+        counts = {key: self.counts.get(key, floor_a) + other.counts.get(key, floor_b) for key in keys}
+        kept = sorted(counts, key=counts.get, reverse=True)[:self.capacity]
+
+        merged = SpaceSaving(self.capacity)
+        merged.counts = {key: counts[key] for key in kept}
+        merged.errors = {key: self.errors.get(key, floor_a) + other.errors.get(key, floor_b) for key in kept}
+        merged.total = self.total + other.total
+        merged._rebuild()
+        return merged
+
+    def to_dict(self):
+        return {'capacity': self.capacity, 'total': self.total,
+                'counters': [[key, count, self.errors[key]] for key, count in self.counts.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data['capacity'])
+        summary.total = data['total']
+        for key, count, error in data['counters']:
+            summary.counts[key] = count
+            summary.errors[key] = error
+        summary._rebuild()
+        return summary
+
+
+class HeavyHitters:
+    # one Space-Saving summary per (dimension, metric)
+    def __init__(self, capacities=None, dimensions=DIMENSIONS, metrics=METRICS):
+        # capacities: counters per dimension, or one number for all of them
+        if isinstance(capacities, int):
+            capacities = dict.fromkeys(dimensions, capacities)
+        self.capacities = {**CAPACITIES, **(capacities or {})}
+        self.summaries = {(dimension, metric): SpaceSaving(self.capacities.get(dimension, CAPACITY))
+                          for dimension in dimensions for metric in metrics}
+        self.rows = 0
+
+    def update(self, df):
+        # df: new transactions with the dimension columns, total_amount, quantity and profit
+        weights = {}
+        for dimension, metric in self.summaries:
+            if metric not in weights:
+                weights[metric] = metric_weights(df, metric)
+            self.summaries[dimension, metric].update_many(df[dimension].to_numpy(), weights[metric])
+        self.rows += len(df)
+        return self
+
+    def merge(self, other):
+        merged = HeavyHitters(self.capacities, dimensions=[], metrics=[])
+        merged.summaries = {name: summary.merge(other.summaries[name]) for name, summary in self.summaries.items()}
+        merged.rows = self.rows + other.rows
+        return merged
+
+    def top(self, dimension='product_id', metric='revenue', n=10, guaranteed_only=False):
+        result = self.summaries[dimension, metric].top(n).rename(columns={'key': dimension})
+        result.insert(0, 'rank', np.arange(1, len(result) + 1))
+        return result[result['guaranteed']].reset_index(drop=True) if guaranteed_only else result
+
+    def top_all(self, n=10, guaranteed_only=False):
+        # every (dimension, metric) top n in one long frame, e.g. for a top-sellers panel;
+        # guaranteed_only keeps just the keys the error bounds prove to be in the true top n
+        frames = []
+        for (dimension, metric), summary in self.summaries.items():
+            result = summary.top(n)
+            result.insert(0, 'rank', np.arange(1, len(result) + 1))
+            result.insert(0, 'metric', metric)
+            result.insert(0, 'dimension', dimension)
+            frames.append(result[result['guaranteed']] if guaranteed_only else result)
+        return pd.concat(frames, ignore_index=True)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'capacities': self.capacities, 'rows': self.rows,
+                       'summaries': [{'dimension': dimension, 'metric': metric, **summary.to_dict()}
+                                     for (dimension, metric), summary in self.summaries.items()]}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        hitters = cls(state['capacities'], dimensions=[], metrics=[])
+        hitters.rows = state['rows']
+        hitters.summaries = {(entry['dimension'], entry['metric']): SpaceSaving.from_dict(entry)
+                             for entry in state['summaries']}
+        return hitters
+
+
+def summarise_partitions(df, partitions, capacities=None):
+    # independent summaries per slice of rows, merged at the end
+    bounds = np.linspace(0, len(df), partitions + 1).astype(int)
+    summaries = [HeavyHitters(capacities).update(df.iloc[start:stop]) for start, stop in zip(bounds, bounds[1:])]
+    merged = summaries[0]
+    for summary in summaries[1:]:
+        merged = merged.merge(summary)
+    return merged
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Approximate top-K products, customers and stores in one pass')
+    parser.add_argument('--input', default='transactions.csv')
+    parser.add_argument('--capacity', type=int, help='counters per summary (default: from the error targets)')
+    parser.add_argument('--error', type=float, help='error target as a fraction of the total, sets the capacity')
+    parser.add_argument('--partitions', type=int, default=1, help='summarise row slices separately and merge')
+    parser.add_argument('--n', type=int, default=10)
+    parser.add_argument('--dimension', default='product_id', choices=DIMENSIONS)
+    parser.add_argument('--metric', default='revenue', choices=METRICS)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input).drop_duplicates(subset=['transaction_id'])
+    capacity = args.capacity or (capacity_for(args.error) if args.error else None)
+    hitters = summarise_partitions(df, args.partitions, capacity)
+    top = hitters.top(args.dimension, args.metric, args.n)
+
+    # the exact totals, only to show how close the summary is
+    exact = pd.Series(metric_weights(df, args.metric)).groupby(df[args.dimension].to_numpy()).sum()
+    top['exact'] = exact.reindex(top[args.dimension]).to_numpy()
+    summary = hitters.summaries[args.dimension, args.metric]
+    print(f"✓ {hitters.rows:,} rows, {args.partitions} partition(s), "
+          f"{len(summary.counts):,}/{summary.capacity:,} counters used")
+    print(f"  Error bound: {summary.min_count:,.2f} ({summary.min_count / summary.total:.3%} of the total)")
+    print(f"  Guaranteed in the true top {args.n}: {top['guaranteed'].sum()}/{len(top)}")
+    print(top.round(2).to_string(index=False))
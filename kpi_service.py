@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import traceback
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from olap_cube import SalesCube
+from rollup_store import TimeRollupStore
+from rfm import compute_rfm
+
+
+# Local HTTP/JSON KPI service. The sales cube, the time rollups and the RFM
+# table are built once at startup; a request only rolls up those
+# pre-aggregates, and the encoded response is kept in a bounded LRU cache so
+# repeated dashboard polls are answered with a dictionary lookup.
+HOST = '127.0.0.1'
+PORT = 8050
+CACHE_SIZE = 256
+MAX_TOP_N = 100
+
+# URL name -> cube attribute
+BREAKDOWNS = {
+    'region': 'region',
+    'category': 'category',
+    'segment': 'customer_segment',
+    'store': 'store_name',
+    'payment': 'payment_method',
+    'month': 'month_start',
+}
+KPI_COLUMNS = ['total_amount', 'profit', 'transaction_count', 'profit_margin', 'avg_transaction']
+TOP_METRICS = ['total_amount', 'profit', 'quantity']
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _records(frame):
+    # pandas' encoder handles numpy scalars, timestamps and NaN (as null)
+    return json.loads(frame.reset_index().to_json(orient='records', date_format='iso', double_precision=2))
+
+
+class KPIStore:
+    def __init__(self, cube, rollups, rfm):
+        self.cube = cube
+        self.rollups = rollups
+        self.rfm = rfm
+        self.built_at = pd.Timestamp.now().isoformat(timespec='seconds')
+
+    @classmethod
+    def load(cls, data_dir='.'):
+        df_master = pd.read_csv(os.path.join(data_dir, 'master_dataset.csv'), parse_dates=['transaction_date'])
+        df_products = pd.read_csv(os.path.join(data_dir, 'products_cleaned.csv'))
+        df_stores = pd.read_csv(os.path.join(data_dir, 'stores_cleaned.csv'))
+        cube = SalesCube.build(df_master, df_products, df_stores)
+        rollups = TimeRollupStore.build(df_master)
+        rfm = compute_rfm(df_master)
+        return cls(cube, rollups, rfm)
+
+    def summary(self):
+        revenue = self.cube.total('total_amount')
+        profit = self.cube.total('profit')
+        count = self.cube.total('transaction_count')
+        return {
+            'total_revenue': round(float(revenue), 2),
+            'total_profit': round(float(profit), 2),
+            'transactions': int(count),
+            'profit_margin': round(float(profit / revenue * 100), 2) if revenue else None,
+            'avg_transaction': round(float(revenue / count), 2) if count else None,
+            'customers': len(self.rfm),
+            'built_at': self.built_at,
+        }
+
+    def breakdown(self, by):
+        if by not in BREAKDOWNS:
+            raise RequestError(404, f"Unknown breakdown '{by}', expected one of {sorted(BREAKDOWNS)}")
+        result = self.cube.rollup(BREAKDOWNS[by])[KPI_COLUMNS]
+        if by != 'month':
+            result = result.sort_values('total_amount', ascending=False)
+        return _records(result.rename_axis(by))
+
+    def trend(self, level, by=None):
+        if level not in self.rollups.levels:
+            raise RequestError(404, f"Unknown rollup level '{level}', expected one of {list(self.rollups.levels)}")
+        if by not in (None, 'store_id', 'category'):
+            raise RequestError(400, "Trends can only be split by 'store_id' or 'category'")
+        return _records(self.rollups.series(level, by))
+
+    def top_products(self, n=10, metric='total_amount'):
+        if metric not in TOP_METRICS:
+            raise RequestError(400, f"Unknown metric '{metric}', expected one of {TOP_METRICS}")
+        result = self.cube.rollup('product_name', measures=['total_amount', 'profit', 'quantity',
+                                                            'transaction_count'])
+        return _records(result.nlargest(n, metric))
+
+    def rfm_distribution(self):
+        scores = self.rfm['rfm_score'].value_counts().sort_index()
+        return {
+            'customers': len(self.rfm),
+            'rfm_score': {str(score): int(count) for score, count in scores.items()},
+            'r_score': self._score_counts('r_score'),
+            'f_score': self._score_counts('f_score'),
+            'm_score': self._score_counts('m_score'),
+        }
+
+    def _score_counts(self, column):
+        counts = np.bincount(self.rfm[column].to_numpy(), minlength=5)[1:]
+        return {str(score): int(count) for score, count in enumerate(counts, start=1)}
+
+
+class ResponseCache:
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        body = self.entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key, body):
+        self.entries[key] = body
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class KPIService:
+    def __init__(self, store, cache_size=CACHE_SIZE):
+        self.store = store
+        self.cache = ResponseCache(cache_size)
+        self.latencies = deque(maxlen=10000)
+        self.routes = {
+            '/kpi/summary': lambda params: store.summary(),
+            '/kpi/breakdown': lambda params: store.breakdown(self._param(params, 'by', 'region')),
+            '/kpi/trend': lambda params: store.trend(self._param(params, 'level', 'monthly'),
+                                                     self._param(params, 'by', None)),
+            '/kpi/top-products': lambda params: store.top_products(self._int_param(params, 'n', 10),
+                                                                   self._param(params, 'metric', 'total_amount')),
+            '/kpi/rfm': lambda params: store.rfm_distribution(),
+        }
+
+    @staticmethod
+    def _param(params, name, default):
+        return params.get(name, [default])[0]
+
+    def _int_param(self, params, name, default):
+        value = self._param(params, name, default)
+        try:
+            value = int(value)
+        except ValueError:
+            raise RequestError(400, f"Parameter '{name}' must be an integer")
+        return min(max(value, 1), MAX_TOP_N)
+
+    def warm(self):
+        # precompute every parameterless endpoint and the default breakdowns
+        targets = ['/kpi/summary', '/kpi/rfm', '/kpi/top-products', '/kpi/trend']
+        targets += [f'/kpi/breakdown?by={by}' for by in BREAKDOWNS]
+        for target in targets:
+            self.respond(target)
+        self.cache.hits = self.cache.misses = 0
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'requests': len(latencies),
+            'p50_ms': round(float(np.percentile(latencies, 50)), 3) if len(latencies) else None,
+            'p99_ms': round(float(np.percentile(latencies, 99)), 3) if len(latencies) else None,
+            'cache_entries': len(self.cache.entries),
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+        }
+
+    def respond(self, target):
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        if url.path == '/health':
+            return 200, b'{"status": "ok"}'
+        if url.path == '/stats':
+            return 200, json.dumps(self.stats()).encode()
+        if url.path not in self.routes:
+            raise RequestError(404, f"Unknown endpoint '{url.path}'")
+
+        key = (url.path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+        body = self.cache.get(key)
+        if body is None:
+            body = json.dumps(self.routes[url.path](params)).encode()
+            self.cache.put(key, body)
+        return 200, body
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip().lower()
+
+                start = time.perf_counter()
+                parts = request_line.decode('latin-1').split()
+                try:
+                    if len(parts) != 3:
+                        raise RequestError(400, 'Malformed request line')
+                    method, target, _ = parts
+                    if method != 'GET':
+                        raise RequestError(405, 'Only GET is supported')
+                    status, body = self.respond(target)
+                except RequestError as e:
+                    status, body = e.status, json.dumps({'error': str(e)}).encode()
+                except Exception:
+                    # a bug in one endpoint answers that request, not the whole connection
+                    traceback.print_exc()
+                    status, body = 500, json.dumps({'error': 'Internal server error'}).encode()
+
+                version = parts[2] if len(parts) == 3 else 'HTTP/1.0'
+                keep_alive = (headers.get('connection') != 'close' if version == 'HTTP/1.1'
+                              else headers.get('connection') == 'keep-alive')
+                head = (f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                        f"Content-Type: application/json\r\n"
+                        f"Content-Length: {len(body)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+                writer.write(head.encode() + body)
+                await writer.drain()
+                self.latencies.append(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+                # give other connections a turn between pipelined requests
+                await asyncio.sleep(0)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            if not loop.is_closed():
+                try:
+                    await writer.wait_closed()
+                except ConnectionError:
+                    pass
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"✓ KPI service listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve KPIs from in-memory pre-aggregates over HTTP/JSON')
+    parser.add_argument('--data-dir', default='.', help='directory with the cleaned CSVs')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE)
+    args = parser.parse_args()
+
+    print("Building pre-aggregates...")
+    start = time.perf_counter()
+    service = KPIService(KPIStore.load(args.data_dir), args.cache_size)
+    service.warm()
+    print(f"✓ Pre-aggregates ready ({time.perf_counter() - start:.1f}s, "
+          f"{len(service.cache.entries)} responses cached)")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -1,142 +1,177 @@
-import psycopg2
+import os
+import sys
+
 import pandas as pd
 
+# the standard libpq variables override the defaults (e.g. for a benchmark instance)
 DB_CONFIG = {
-    'host': 'localhost',
-    'port': 5432,
-    'user': 'postgres',
-    'password': 'Success*56',  
-    'database': 'retail_sales_analytics'
+    'host': os.environ.get('PGHOST', 'localhost'),
+    'port': int(os.environ.get('PGPORT', 5432)),
+    'user': os.environ.get('PGUSER', 'postgres'),
+    # no default password when a password file is given, so libpq reads that instead
+    'password': os.environ.get('PGPASSWORD', None if 'PGPASSFILE' in os.environ else 'Success*56'),
+    'database': os.environ.get('PGDATABASE', 'retail_sales_analytics')
 }
 
-print("LOADING CSV DATA INTO POSTGRESQL")
-
-try:
-    conn = psycopg2.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    print("✓ Connected to PostgreSQL\n")
-except Exception as e:
-    print(f"✗ Connection failed: {e}")
-    print("\nMake sure:")
-    print("1. PostgreSQL is running")
-    print("2. Database 'retail_analytics' exists")
-    print("3. Your password is correct")
-    exit(1)
-
-print("Loading products...")
-try:
-    df = pd.read_csv('products.csv')
-    for _, row in df.iterrows():
-        cursor.execute('''
-            INSERT INTO dim_products (product_id, product_name, category, unit_cost, unit_price)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (product_id) DO NOTHING
-        ''', (int(row['product_id']), row['product_name'], row['category'], 
-              float(row['unit_cost']), float(row['unit_price'])))
-    conn.commit()
-    print(f"✓ Loaded {len(df)} products")
-except Exception as e:
-    print(f"✗ Error loading products: {e}")
-    conn.rollback()
-
-
-print("Loading stores...")
-try:
-    df = pd.read_csv('stores.csv')
-    for _, row in df.iterrows():
-        cursor.execute('''
-            INSERT INTO dim_stores (store_id, store_name, region, city, state, opened_date)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (store_id) DO NOTHING
-        ''', (int(row['store_id']), row['store_name'], row['region'], 
-              row['city'], row['state'], row['opened_date']))
-    conn.commit()
-    print(f"✓ Loaded {len(df)} stores")
-except Exception as e:
-    print(f"✗ Error loading stores: {e}")
-    conn.rollback()
-
-
-print("Loading customers...")
-try:
-    df = pd.read_csv('customers.csv')
-    batch_size = 1000
-    for i in range(0, len(df), batch_size):
-        batch = df.iloc[i:i+batch_size]
-        for _, row in batch.iterrows():
+
+def connect(config=DB_CONFIG):
+    # psycopg2 is only imported when a connection is actually made
+    import psycopg2
+    return psycopg2.connect(**config)
+
+
+def load_products(conn, cursor, path='products.csv'):
+    print("Loading products...")
+    try:
+        df = pd.read_csv(path)
+        for _, row in df.iterrows():
             cursor.execute('''
-                INSERT INTO dim_customers (customer_id, customer_name, email, join_date, customer_segment)
+                INSERT INTO dim_products (product_id, product_name, category, unit_cost, unit_price)
                 VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (customer_id) DO NOTHING
-            ''', (int(row['customer_id']), row['customer_name'], row['email'], 
-                  row['join_date'], row['customer_segment']))
+                ON CONFLICT (product_id) DO NOTHING
+            ''', (int(row['product_id']), row['product_name'], row['category'],
+                  float(row['unit_cost']), float(row['unit_price'])))
         conn.commit()
-        print(f"  Progress: {min(i+batch_size, len(df))}/{len(df)} customers", end='\r')
-    print(f"\n✓ Loaded {len(df)} customers")
-except Exception as e:
-    print(f"\n✗ Error loading customers: {e}")
-    conn.rollback()
-
-
-print("Loading transactions...")
-try:
-    df = pd.read_csv('transactions.csv')
-    batch_size = 1000
-    total = len(df)
-    
-    for i in range(0, total, batch_size):
-        batch = df.iloc[i:i+batch_size]
-        for _, row in batch.iterrows():
+        print(f"✓ Loaded {len(df)} products")
+        return df['product_id'].nunique()
+    except Exception as e:
+        print(f"✗ Error loading products: {e}")
+        conn.rollback()
+
+
+def load_stores(conn, cursor, path='stores.csv'):
+    print("Loading stores...")
+    try:
+        df = pd.read_csv(path)
+        for _, row in df.iterrows():
             cursor.execute('''
-                INSERT INTO fact_sales 
-                (transaction_id, transaction_date, store_id, customer_id, product_id,
-                 quantity, unit_price, discount_pct, discount_amount, total_amount,
-                 total_cost, profit, profit_margin, payment_method)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (transaction_id) DO NOTHING
-            ''', (int(row['transaction_id']), row['transaction_date'], 
-                  int(row['store_id']), int(row['customer_id']), int(row['product_id']),
-                  int(row['quantity']), float(row['unit_price']), float(row['discount_pct']),
-                  float(row['discount_amount']), float(row['total_amount']), 
-                  float(row['total_cost']), float(row['profit']), 
-                  float(row['profit_margin']), row['payment_method']))
+                INSERT INTO dim_stores (store_id, store_name, region, city, state, opened_date)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (store_id) DO NOTHING
+            ''', (int(row['store_id']), row['store_name'], row['region'],
+                  row['city'], row['state'], row['opened_date']))
         conn.commit()
-        print(f"  Progress: {min(i+batch_size, total)}/{total} transactions", end='\r')
-    
-    print(f"\n✓ Loaded {total} transactions")
-except Exception as e:
-    print(f"\n✗ Error loading transactions: {e}")
-    conn.rollback()
-
-
-print("\n" + "=" * 70)
-print("VERIFICATION")
-print("=" * 70)
-
-cursor.execute("SELECT COUNT(*) FROM dim_products")
-print(f"Products: {cursor.fetchone()[0]:,} records")
-
-cursor.execute("SELECT COUNT(*) FROM dim_stores")
-print(f"Stores: {cursor.fetchone()[0]:,} records")
-
-cursor.execute("SELECT COUNT(*) FROM dim_customers")
-print(f"Customers: {cursor.fetchone()[0]:,} records")
-
-cursor.execute("SELECT COUNT(*) FROM fact_sales")
-print(f"Transactions: {cursor.fetchone()[0]:,} records")
-
-cursor.execute('''
-    SELECT 
-        ROUND(SUM(total_amount)::numeric, 2) as revenue,
-        ROUND(SUM(profit)::numeric, 2) as profit
-    FROM fact_sales
-''')
-result = cursor.fetchone()
-print(f"\nTotal Revenue: ${result[0]:,}")
-print(f"Total Profit: ${result[1]:,}")
-
-cursor.close()
-conn.close()
-
-print("✓ DATA LOADED SUCCESSFULLY!")
-
+        print(f"✓ Loaded {len(df)} stores")
+        return df['store_id'].nunique()
+    except Exception as e:
+        print(f"✗ Error loading stores: {e}")
+        conn.rollback()
+
+
+def load_customers(conn, cursor, path='customers.csv', batch_size=1000):
+    print("Loading customers...")
+    try:
+        df = pd.read_csv(path)
+        for i in range(0, len(df), batch_size):
+            batch = df.iloc[i:i+batch_size]
+            for _, row in batch.iterrows():
+                cursor.execute('''
+                    INSERT INTO dim_customers (customer_id, customer_name, email, join_date, customer_segment)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT (customer_id) DO NOTHING
+                ''', (int(row['customer_id']), row['customer_name'], row['email'],
+                      row['join_date'], row['customer_segment']))
+            conn.commit()
+            print(f"  Progress: {min(i+batch_size, len(df))}/{len(df)} customers", end='\r')
+        print(f"\n✓ Loaded {len(df)} customers")
+        return df['customer_id'].nunique()
+    except Exception as e:
+        print(f"\n✗ Error loading customers: {e}")
+        conn.rollback()
+
+
+def load_transactions(conn, cursor, path='transactions.csv', batch_size=1000):
+    print("Loading transactions...")
+    try:
+        df = pd.read_csv(path)
+        total = len(df)
+
+        for i in range(0, total, batch_size):
+            batch = df.iloc[i:i+batch_size]
+            for _, row in batch.iterrows():
+                cursor.execute('''
+                    INSERT INTO fact_sales
+                    (transaction_id, transaction_date, store_id, customer_id, product_id,
+                     quantity, unit_price, discount_pct, discount_amount, total_amount,
+                     total_cost, profit, profit_margin, payment_method)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (transaction_id) DO NOTHING
+                ''', (int(row['transaction_id']), row['transaction_date'],
+                      int(row['store_id']), int(row['customer_id']), int(row['product_id']),
+                      int(row['quantity']), float(row['unit_price']), float(row['discount_pct']),
+                      float(row['discount_amount']), float(row['total_amount']),
+                      float(row['total_cost']), float(row['profit']),
+                      float(row['profit_margin']), row['payment_method']))
+            conn.commit()
+            print(f"  Progress: {min(i+batch_size, total)}/{total} transactions", end='\r')
+
+        print(f"\n✓ Loaded {total} transactions")
+        return df['transaction_id'].nunique()
+    except Exception as e:
+        print(f"\n✗ Error loading transactions: {e}")
+        conn.rollback()
+
+
+def verify(cursor):
+    print("\n" + "=" * 70)
+    print("VERIFICATION")
+    print("=" * 70)
+
+    counts = {}
+    for table, label in [('dim_products', 'Products'), ('dim_stores', 'Stores'),
+                         ('dim_customers', 'Customers'), ('fact_sales', 'Transactions')]:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = cursor.fetchone()[0]
+        print(f"{label}: {counts[table]:,} records")
+
+    cursor.execute('''
+        SELECT
+            ROUND(COALESCE(SUM(total_amount), 0)::numeric, 2) as revenue,
+            ROUND(COALESCE(SUM(profit), 0)::numeric, 2) as profit
+        FROM fact_sales
+    ''')
+    result = cursor.fetchone()
+    print(f"\nTotal Revenue: ${result[0]:,}")
+    print(f"Total Profit: ${result[1]:,}")
+    return counts
+
+
+def main(data_dir='.'):
+    print("LOADING CSV DATA INTO POSTGRESQL")
+
+    try:
+        conn = connect()
+        cursor = conn.cursor()
+        print("✓ Connected to PostgreSQL\n")
+    except Exception as e:
+        print(f"✗ Connection failed: {e}")
+        print("\nMake sure:")
+        print("1. PostgreSQL is running")
+        print("2. Database 'retail_analytics' exists")
+        print("3. Your password is correct")
+        sys.exit(1)
+
+    # distinct keys each file holds, None for a table whose load failed
+    expected = {
+        'dim_products': load_products(conn, cursor, os.path.join(data_dir, 'products.csv')),
+        'dim_stores': load_stores(conn, cursor, os.path.join(data_dir, 'stores.csv')),
+        'dim_customers': load_customers(conn, cursor, os.path.join(data_dir, 'customers.csv')),
+        'fact_sales': load_transactions(conn, cursor, os.path.join(data_dir, 'transactions.csv')),
+    }
+
+    counts = verify(cursor)
+
+    cursor.close()
+    conn.close()
+
+    # a failed table or one with fewer rows than its file exits non-zero, so callers
+    # (the orchestrator, the benchmark) do not take a partial load for a finished one
+    failed = [table for table, rows in expected.items() if rows is None or counts[table] < rows]
+    if failed:
+        print(f"✗ LOAD INCOMPLETE: {', '.join(failed)}")
+        sys.exit(1)
+    print("✓ DATA LOADED SUCCESSFULLY!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from star_join import DimensionIndex
+
+
+# Pre-aggregated sales cube. The fact table is scanned once and summed to the
+# grain below; every breakdown used by the pipeline, the charts and the reports
+# is then rolled up from the cube cells, which are far fewer than the
+# transactions. Distinct counts (e.g. unique customers) are not additive and
+# cannot be answered from the cube.
+GRAIN = ['date', 'store_id', 'product_id', 'customer_segment', 'payment_method', 'discount_pct']
+
+MEASURES = {
+    'total_amount': 'total_amount',
+    'profit': 'profit',
+    'total_cost': 'total_cost',
+    'quantity': 'quantity',
+    'discount_amount': 'discount_amount',
+    'unit_price_sum': 'unit_price',
+    'profit_margin_pct_sum': 'profit_margin_pct',
+}
+
+PRODUCT_ATTRS = ['product_name', 'category', 'margin_category']
+STORE_ATTRS = ['store_name', 'region', 'city']
+
+SEASONS = np.array(['Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                    'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'])
+DISCOUNT_BINS = [0, 5, 10, 15, 20, 30, 100]
+DISCOUNT_LABELS = ['No Discount', '1-5%', '6-10%', '11-15%', '16-20%', '21%+']
+
+
+class SalesCube:
+    def __init__(self, cells, df_products=None, df_stores=None):
+        self.cells = cells
+        self.products = None
+        self.stores = None
+        if df_products is not None:
+            self.products = DimensionIndex(df_products, 'product_id',
+                                           [col for col in PRODUCT_ATTRS if col in df_products])
+        if df_stores is not None:
+            self.stores = DimensionIndex(df_stores, 'store_id',
+                                         [col for col in STORE_ATTRS if col in df_stores])
+        self._attributes = {}
+
+    @classmethod
+    def build(cls, df, df_products=None, df_stores=None, df_customers=None):
+        frame = pd.DataFrame({'date': pd.to_datetime(df['transaction_date']).dt.normalize()})
+        for col in GRAIN[1:]:
+            if col == 'customer_segment' and col not in df:
+                segments = DimensionIndex(df_customers, 'customer_id', ['customer_segment'])
+                frame[col] = segments.gather(col, segments.positions(df['customer_id'].to_numpy()))
+            else:
+                frame[col] = df[col].to_numpy()
+        for measure, source in MEASURES.items():
+            if source == 'profit_margin_pct' and source not in df:
+                frame[measure] = (df['profit'] / df['total_amount'] * 100).round(2).to_numpy()
+            else:
+                frame[measure] = df[source].to_numpy()
+        frame['transaction_count'] = 1
+
+        cells = frame.groupby(GRAIN, sort=False, dropna=False, observed=True).sum().reset_index()
+        return cls(cells, df_products, df_stores)
+
+    def attribute(self, name):
+        if name in self.cells:
+            return self.cells[name].to_numpy()
+        if name in self._attributes:
+            return self._attributes[name]
+
+        dates = self.cells['date']
+        if name == 'year':
+            values = dates.dt.year.to_numpy()
+        elif name == 'month':
+            values = dates.dt.month.to_numpy()
+        elif name == 'month_name':
+            values = dates.dt.month_name().to_numpy()
+        elif name == 'quarter':
+            values = dates.dt.quarter.to_numpy()
+        elif name == 'day_of_week':
+            values = dates.dt.dayofweek.to_numpy()
+        elif name == 'day_name':
+            values = dates.dt.day_name().to_numpy()
+        elif name == 'week_of_year':
+            values = dates.dt.isocalendar().week.to_numpy()
+        elif name == 'month_start':
+            values = dates.dt.to_period('M').dt.to_timestamp().to_numpy()
+        elif name == 'season':
+            values = SEASONS[dates.dt.month.to_numpy() - 1]
+        elif name == 'discount_range':
+            values = pd.cut(self.cells['discount_pct'], bins=DISCOUNT_BINS,
+                            labels=DISCOUNT_LABELS, include_lowest=True).to_numpy()
+        elif self.products is not None and name in self.products.columns:
+            values = self.products.gather(name, self._positions(self.products))
+        elif self.stores is not None and name in self.stores.columns:
+            values = self.stores.gather(name, self._positions(self.stores))
+        else:
+            raise KeyError(f"Unknown cube attribute: {name}")
+        self._attributes[name] = values
+        return values
+
+    def _positions(self, dim):
+        key = f'_{dim.key}_positions'
+        if key not in self._attributes:
+            self._attributes[key] = dim.positions(self.cells[dim.key].to_numpy())
+        return self._attributes[key]
+
+    def rollup(self, by, measures=None, sort=True):
+        by = [by] if isinstance(by, str) else list(by)
+        measures = measures or list(MEASURES) + ['transaction_count']
+        frame = pd.DataFrame({name: self.attribute(name) for name in by})
+        for measure in measures:
+            frame[measure] = self.cells[measure].to_numpy()
+        result = frame.groupby(by, sort=sort, observed=True)[measures].sum()
+
+        # ratios are derived after summing so they stay exact at every level
+        if 'transaction_count' in result:
+            count = result['transaction_count']
+            if 'total_amount' in result:
+                result['avg_transaction'] = result['total_amount'] / count
+            if 'unit_price_sum' in result:
+                result['avg_unit_price'] = result['unit_price_sum'] / count
+            if 'profit_margin_pct_sum' in result:
+                result['avg_profit_margin_pct'] = result['profit_margin_pct_sum'] / count
+        if 'profit' in result and 'total_amount' in result:
+            result['profit_margin'] = result['profit'] / result['total_amount'] * 100
+        return result
+
+    def total(self, measure):
+        return self.cells[measure].sum()
@@ -0,0 +1,214 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from load_data_to_postgres import DB_CONFIG
+
+
+# One entry point for the whole workflow. Generation, cleaning, the Postgres
+# load, the Postgres summaries and chart rendering are stages of a dependency
+# graph; every stage whose dependencies are done is started right away, so
+# independent branches (e.g. loading Postgres while rendering charts) run
+# concurrently. A stage is skipped when all of its outputs exist and are
+# newer than all of its inputs, code included.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_DIR = '.orchestrator'
+
+RAW = ['products.csv', 'stores.csv', 'customers.csv', 'transactions.csv']
+CLEANED = ['transactions_cleaned.csv', 'master_dataset.csv', 'products_cleaned.csv',
+           'customers_cleaned.csv', 'stores_cleaned.csv']
+ZONE_MAP = os.path.join('master_blocks', 'zone_map.json')
+CHARTS = [os.path.join('visualizations', name) for name in [
+    '1_revenue_profit_trends.png', '2_product_category_analysis.png', '3_geographic_store_analysis.png',
+    '4_customer_analysis.png', '5_discount_profitability_analysis.png']]
+
+
+def code(*modules):
+    return [os.path.join(REPO_DIR, module) for module in modules]
+
+
+def python(script, *args):
+    return [sys.executable, os.path.join(REPO_DIR, script), *args]
+
+
+class Stage:
+    def __init__(self, name, command, inputs, outputs, deps=(), description=''):
+        self.name = name
+        self.command = command
+        self.inputs = inputs
+        self.outputs = outputs
+        self.deps = list(deps)
+        self.description = description
+
+    def is_up_to_date(self, workdir):
+        outputs = [os.path.join(workdir, path) for path in self.outputs]
+        inputs = [os.path.join(workdir, path) for path in self.inputs]
+        if not all(os.path.exists(path) for path in outputs):
+            return False
+        missing = [path for path in inputs if not os.path.exists(path)]
+        if missing:
+            return False
+        newest_input = max((os.path.getmtime(path) for path in inputs), default=0)
+        # a stage with a stamp is judged by the stamp alone: its other outputs only have to exist,
+        # since the command may leave unchanged files untouched (the chart render cache does)
+        stamps = [os.path.join(workdir, path) for path in self.outputs if path.startswith(STATE_DIR)]
+        return min(os.path.getmtime(path) for path in stamps or outputs) >= newest_input
+
+
+def build_graph():
+    # stages without a file output (the Postgres load), that may skip rewriting their outputs
+    # (chart rendering) or that leave partial output when they fail (psql) write a stamp file
+    stamp = lambda name: os.path.join(STATE_DIR, f'{name}.done')
+    return {stage.name: stage for stage in [
+        Stage('generate', python('generate_data.py'),
+              code('generate_data.py'), RAW,
+              description='generate the raw CSVs'),
+        Stage('clean', python('data_cleaning_pipeline.py'),
+              RAW + code('data_cleaning_pipeline.py', 'data_profiler.py', 'validation_rules.py', 'star_join.py',
+                         'rfm.py', 'cohorts.py', 'olap_cube.py', 'rollup_store.py', 'basket_mining.py',
+                         'pipeline_trace.py', 'backends.py', 'zone_maps.py'),
+              CLEANED + [ZONE_MAP], deps=['generate'],
+              description='clean, enrich and analyse; write the cleaned CSVs'),
+        Stage('load', python('load_data_to_postgres.py'),
+              RAW + code('load_data_to_postgres.py'), [stamp('load')], deps=['generate'],
+              description='load the raw CSVs into PostgreSQL'),
+        # -w: fail instead of prompting for a password; ON_ERROR_STOP: a failing query fails the
+        # stage (and its stamp keeps the partial output of a failed run from counting as done)
+        Stage('summaries', ['psql', '-X', '-w', '-v', 'ON_ERROR_STOP=1',
+                            '-f', os.path.join(REPO_DIR, 'queries.sql'), '-o', 'postgres_summaries.txt'],
+              [stamp('load')] + code('queries.sql'), ['postgres_summaries.txt', stamp('summaries')],
+              deps=['load'],
+              description='run queries.sql against PostgreSQL'),
+        Stage('render', python('visualizations.py'),
+              CLEANED + code('visualizations.py', 'olap_cube.py', 'rollup_store.py', 'star_join.py',
+                             'render_cache.py', 'plot_binning.py'),
+              CHARTS + [stamp('render')], deps=['clean'],
+              description='render the dashboard PNGs'),
+    ]}
+
+
+def select(graph, targets, exclude=()):
+    # the requested stages and everything they depend on, minus excluded branches
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name in selected or name in exclude:
+            continue
+        selected.add(name)
+        pending.extend(graph[name].deps)
+    return [name for name in graph if name in selected]
+
+
+def stage_env():
+    env = dict(os.environ)
+    # psql connects with the same settings load_data_to_postgres.py uses, password included
+    # (unless PGPASSFILE points libpq to a password file)
+    for name, key in [('PGHOST', 'host'), ('PGPORT', 'port'), ('PGUSER', 'user'),
+                      ('PGPASSWORD', 'password'), ('PGDATABASE', 'database')]:
+        if DB_CONFIG[key] is not None:
+            env.setdefault(name, str(DB_CONFIG[key]))
+    return env
+
+
+def run_stage(stage, workdir, env):
+    log_path = os.path.join(workdir, STATE_DIR, 'logs', f'{stage.name}.log')
+    start = time.perf_counter()
+    with open(log_path, 'w') as log:
+        result = subprocess.run(stage.command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    if result.returncode == 0:
+        for output in stage.outputs:
+            if output.startswith(STATE_DIR):
+                with open(os.path.join(workdir, output), 'w') as f:
+                    f.write(f'{time.time()}\n')
+    return result.returncode, time.perf_counter() - start, log_path
+
+
+def run(graph, names, workdir='.', jobs=None, force=False, dry_run=False):
+    os.makedirs(os.path.join(workdir, STATE_DIR, 'logs'), exist_ok=True)
+    env = stage_env()
+    status = {}
+    remaining = list(names)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs or len(names) or 1) as pool:
+        while remaining or running:
+            for name in list(remaining):
+                stage = graph[name]
+                deps = [dep for dep in stage.deps if dep in names]
+                if any(status.get(dep) in ('failed', 'blocked') for dep in deps):
+                    status[name] = 'blocked'
+                    remaining.remove(name)
+                    print(f"✗ {name}: skipped, a dependency failed")
+                elif all(dep in status for dep in deps):
+                    remaining.remove(name)
+                    # an upstream stage that ran rewrites its outputs, which makes this stage stale by mtime
+                    upstream_pending = any(status[dep] == 'would run' for dep in deps)
+                    if not force and not upstream_pending and stage.is_up_to_date(workdir):
+                        status[name] = 'up to date'
+                        print(f"✓ {name}: up to date")
+                    elif dry_run:
+                        status[name] = 'would run'
+                        print(f"  {name}: would run ({' '.join(os.path.basename(c) for c in stage.command)})")
+                    else:
+                        print(f"  {name}: started ({stage.description})")
+                        running[pool.submit(run_stage, stage, workdir, env)] = name
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    returncode, seconds, log_path = future.result()
+                except OSError as e:
+                    returncode, seconds, log_path = None, 0, str(e)
+                if returncode == 0:
+                    status[name] = 'done'
+                    print(f"✓ {name}: done ({seconds:.1f}s)")
+                else:
+                    status[name] = 'failed'
+                    print(f"✗ {name}: failed (exit {returncode}), see {log_path}")
+    return status
+
+
+def main(argv=None):
+    graph = build_graph()
+    parser = argparse.ArgumentParser(description='Run the retail analytics workflow as a dependency graph')
+    parser.add_argument('targets', nargs='*', default=list(graph),
+                        help=f"stages to bring up to date (default: all of {list(graph)})")
+    parser.add_argument('--skip', default='', help='comma-separated stages to leave out, e.g. load,summaries')
+    parser.add_argument('--force', action='store_true', help='run stages even if their outputs are up to date')
+    parser.add_argument('--jobs', type=int, default=None, help='maximum number of concurrent stages')
+    parser.add_argument('--dry-run', action='store_true', help='only show which stages would run')
+    parser.add_argument('--workdir', default='.', help='directory with the data files')
+    parser.add_argument('--list', action='store_true', help='show the stage graph and exit')
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.targets + [s for s in args.skip.split(',') if s] if name not in graph]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    if args.list:
+        for stage in graph.values():
+            print(f"{stage.name:<10} <- {', '.join(stage.deps) or '-':<10} {stage.description}")
+        return 0
+
+    names = select(graph, args.targets, exclude=set(filter(None, args.skip.split(','))))
+    if 'summaries' in names and not args.dry_run and shutil.which('psql') is None:
+        print("✗ summaries: psql not found, leaving it out")
+        names.remove('summaries')
+
+    start = time.perf_counter()
+    status = run(graph, names, args.workdir, args.jobs, args.force, args.dry_run)
+    failed = [name for name, state in status.items() if state in ('failed', 'blocked')]
+    print(f"\n{'✗' if failed else '✓'} Workflow finished in {time.perf_counter() - start:.1f}s"
+          + (f" ({', '.join(failed)} did not complete)" if failed else ''))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import argparse
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+
+# Per-stage instrumentation for the cleaning pipeline. Each stage records wall
+# time, CPU time, the tracemalloc peak reached while it ran and the in-memory
+# size of the DataFrames it produced; stages can optionally be run under
+# cProfile. The trace is written as JSON and two traces can be compared.
+#
+# Tracing is off unless PIPELINE_TRACE (trace path) or PIPELINE_PROFILE
+# (comma-separated stage names, or 'all') is set, so a normal run pays nothing.
+SCHEMA_VERSION = 1
+TRACE_PATH = 'pipeline_trace.json'
+TOP_FUNCTIONS = 15
+METRICS = ['wall_seconds', 'cpu_seconds', 'alloc_peak_mb', 'dataframe_mb']
+
+MB = 1024 * 1024
+
+
+def frame_bytes(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    return 0
+
+
+class PipelineTracer:
+    def __init__(self, path=None, profile=(), enabled=True):
+        self.enabled = enabled
+        self.path = path or TRACE_PATH
+        self.profile = set(profile)
+        self.profile_dir = os.path.join(os.path.dirname(os.path.abspath(self.path)), 'profiles')
+        self.stages = []
+        self.created = datetime.now()
+        self._current = None
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @classmethod
+    def from_env(cls):
+        path = os.environ.get('PIPELINE_TRACE')
+        profile = [name for name in os.environ.get('PIPELINE_PROFILE', '').split(',') if name]
+        return cls(path, profile, enabled=bool(path or profile))
+
+    def _profiled(self, name):
+        return name in self.profile or 'all' in self.profile
+
+    def begin(self, name):
+        if not self.enabled:
+            return
+        if self._current is not None:
+            self.end()
+        tracemalloc.reset_peak()
+        self._current = {
+            'name': name,
+            'traced_start': tracemalloc.get_traced_memory()[0],
+            'wall_start': time.perf_counter(),
+            'cpu_start': time.process_time(),
+            'profiler': cProfile.Profile() if self._profiled(name) else None,
+        }
+        if self._current['profiler']:
+            self._current['profiler'].enable()
+
+    def end(self, **frames):
+        # frames are the DataFrames the stage produced, by name
+        if not self.enabled or self._current is None:
+            return
+        current, self._current = self._current, None
+        profiler = current['profiler']
+        if profiler:
+            profiler.disable()
+        wall = time.perf_counter() - current['wall_start']
+        cpu = time.process_time() - current['cpu_start']
+        traced, peak = tracemalloc.get_traced_memory()
+
+        produced = {name: frame_bytes(frame) for name, frame in frames.items()}
+        record = {
+            'name': current['name'],
+            'wall_seconds': round(wall, 4),
+            'cpu_seconds': round(cpu, 4),
+            'alloc_peak_mb': round((peak - current['traced_start']) / MB, 2),
+            'traced_mb': round(traced / MB, 2),
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'dataframe_mb': round(sum(produced.values()) / MB, 2),
+            'dataframes': {name: {'mb': round(size / MB, 2), 'rows': len(frames[name])}
+                           for name, size in produced.items()},
+        }
+        if profiler:
+            record['profile'] = self._dump_profile(current['name'], profiler)
+        self.stages.append(record)
+
+    @contextmanager
+    def stage(self, name):
+        # with tracer.stage('rfm') as produced: produced['rfm'] = compute_rfm(...)
+        produced = {}
+        self.begin(name)
+        try:
+            yield produced
+        finally:
+            # a stage that raises is still closed, with whatever it produced so far
+            self.end(**produced)
+
+    def _dump_profile(self, name, profiler):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f'{name}.prof')
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler, stream=io.StringIO()).sort_stats('cumulative')
+        top = []
+        for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+            top.append({'function': f'{os.path.basename(filename)}:{line}({function})', 'calls': calls,
+                        'own_seconds': round(own, 4), 'cumulative_seconds': round(cumulative, 4)})
+        top.sort(key=lambda entry: entry['cumulative_seconds'], reverse=True)
+        return {'path': path, 'top': top[:TOP_FUNCTIONS]}
+
+    def trace(self):
+        return {
+            'schema_version': SCHEMA_VERSION,
+            'created': self.created.isoformat(timespec='seconds'),
+            'script': os.path.basename(sys.argv[0]),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'stages': self.stages,
+            'total': {
+                'wall_seconds': round(sum(stage['wall_seconds'] for stage in self.stages), 4),
+                'cpu_seconds': round(sum(stage['cpu_seconds'] for stage in self.stages), 4),
+                'alloc_peak_mb': max((stage['alloc_peak_mb'] for stage in self.stages), default=0),
+                'max_rss_mb': max((stage['max_rss_mb'] for stage in self.stages), default=0),
+            },
+        }
+
+    def save(self):
+        if not self.enabled:
+            return None
+        self.end()
+        with open(self.path, 'w') as f:
+            json.dump(self.trace(), f, indent=2)
+        print(f"✓ Pipeline trace saved: {self.path} ({len(self.stages)} stages)")
+        return self.path
+
+
+def load_trace(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_traces(baseline, current, metrics=METRICS):
+    # one row per stage, with the baseline and current value and the relative change per metric
+    base = pd.DataFrame(baseline['stages']).set_index('name')[metrics]
+    curr = pd.DataFrame(current['stages']).set_index('name')[metrics]
+    stages = list(dict.fromkeys(list(base.index) + list(curr.index)))
+    base, curr = base.reindex(stages), curr.reindex(stages)
+    columns = {}
+    for metric in metrics:
+        columns[(metric, 'baseline')] = base[metric]
+        columns[(metric, 'current')] = curr[metric]
+        columns[(metric, 'change_pct')] = ((curr[metric] / base[metric] - 1) * 100).round(1)
+    return pd.DataFrame(columns).rename_axis('stage')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare two cleaning pipeline traces')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--metrics', default=','.join(METRICS))
+    args = parser.parse_args()
+
+    comparison = compare_traces(load_trace(args.baseline), load_trace(args.current), args.metrics.split(','))
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(comparison)
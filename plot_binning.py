@@ -0,0 +1,37 @@
+import numpy as np
+
+
+# Pre-binned plotting helpers. Histograms and point clouds are reduced to
+# bin counts with NumPy before they reach matplotlib, so drawing cost depends
+# on the number of bins, not on the number of rows.
+MAX_SCATTER_POINTS = 5000
+
+
+def histogram(values, bins=50, range=None):
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    counts, edges = np.histogram(values, bins=bins, range=range)
+    return counts, edges
+
+
+def plot_histogram(ax, counts, edges, **kwargs):
+    # hist() over the bin left edges weighted by the counts draws the same bars
+    # as hist() over the raw values, but only len(counts) points are passed in
+    return ax.hist(edges[:-1], bins=edges, weights=counts, **kwargs)
+
+
+def density_2d(x, y, bins=200, weights=None):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[finite]
+    counts, x_edges, y_edges = np.histogram2d(x[finite], y[finite], bins=bins, weights=weights)
+    return counts, x_edges, y_edges
+
+
+def plot_density(ax, counts, x_edges, y_edges, cmap='viridis', log=True, **kwargs):
+    values = np.ma.masked_equal(counts.T, 0)
+    if log:
+        values = np.ma.log10(values)
+    return ax.pcolormesh(x_edges, y_edges, values, cmap=cmap, **kwargs)
@@ -0,0 +1,194 @@
+import argparse
+import os
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from load_data_to_postgres import DB_CONFIG, connect
+
+
+# Reads the warehouse tables back into DataFrames so the analytics can run
+# against PostgreSQL instead of exported CSVs. Rows are streamed in chunks,
+# either through a named (server-side) cursor or through COPY ... TO STDOUT
+# that pandas parses while it arrives, so the client never holds a whole
+# result set as Python tuples. fact_sales can be limited to a date range.
+# The frames have the same columns as the raw CSVs, so the pipeline treats
+# both sources alike.
+CHUNK_ROWS = 50_000
+METHODS = ['copy', 'cursor']
+
+# pipeline table -> (warehouse table, date column, [(column, SQL expression, dtype)]);
+# NUMERIC is read as float8 and dates as ISO text, like read_csv gives them
+TABLES = {
+    'products': ('dim_products', None, [
+        ('product_id', 'product_id', 'int64'),
+        ('product_name', 'product_name', 'str'),
+        ('category', 'category', 'str'),
+        ('unit_cost', 'unit_cost::float8', 'float64'),
+        ('unit_price', 'unit_price::float8', 'float64'),
+    ]),
+    'stores': ('dim_stores', None, [
+        ('store_id', 'store_id', 'int64'),
+        ('store_name', 'store_name', 'str'),
+        ('region', 'region', 'str'),
+        ('city', 'city', 'str'),
+        ('state', 'state', 'str'),
+        ('opened_date', "to_char(opened_date, 'YYYY-MM-DD')", 'str'),
+    ]),
+    'customers': ('dim_customers', None, [
+        ('customer_id', 'customer_id', 'int64'),
+        ('customer_name', 'customer_name', 'str'),
+        ('email', 'email', 'str'),
+        ('join_date', "to_char(join_date, 'YYYY-MM-DD')", 'str'),
+        ('customer_segment', 'customer_segment', 'str'),
+    ]),
+    'transactions': ('fact_sales', 'transaction_date', [
+        ('transaction_id', 'transaction_id', 'int64'),
+        ('transaction_date', "to_char(transaction_date, 'YYYY-MM-DD')", 'str'),
+        ('store_id', 'store_id', 'int64'),
+        ('customer_id', 'customer_id', 'int64'),
+        ('product_id', 'product_id', 'int64'),
+        ('quantity', 'quantity', 'int64'),
+        ('unit_price', 'unit_price::float8', 'float64'),
+        ('discount_pct', 'discount_pct::float8', 'float64'),
+        ('discount_amount', 'discount_amount::float8', 'float64'),
+        ('total_amount', 'total_amount::float8', 'float64'),
+        ('total_cost', 'total_cost::float8', 'float64'),
+        ('profit', 'profit::float8', 'float64'),
+        ('payment_method', 'payment_method', 'str'),
+        ('year', 'extract(year FROM transaction_date)::int', 'int64'),
+        ('month', 'extract(month FROM transaction_date)::int', 'int64'),
+        ('quarter', 'extract(quarter FROM transaction_date)::int', 'int64'),
+        ('day_of_week', "trim(to_char(transaction_date, 'Day'))", 'str'),
+        ('profit_margin', 'profit_margin::float8', 'float64'),
+    ]),
+}
+
+
+def table_query(table, start=None, end=None):
+    # start is inclusive, end exclusive; only fact_sales has a date filter
+    source, date_column, columns = TABLES[table]
+    query = f"SELECT {', '.join(f'{expr} AS {name}' for name, expr, _ in columns)} FROM {source}"
+    clauses, params = [], []
+    if date_column and start is not None:
+        clauses.append(f'{date_column} >= %s')
+        params.append(start)
+    if date_column and end is not None:
+        clauses.append(f'{date_column} < %s')
+        params.append(end)
+    if clauses:
+        query += ' WHERE ' + ' AND '.join(clauses)
+    # primary key order, so both methods (and repeated runs) give the same rows in the same order
+    return query + f' ORDER BY {columns[0][0]}', params
+
+
+def conform(chunk, table):
+    # integer columns holding NULLs become float64, as read_csv would make them
+    for name, _, dtype in TABLES[table][2]:
+        if dtype == 'str':
+            continue
+        if dtype == 'int64' and chunk[name].isna().any():
+            dtype = 'float64'
+        chunk[name] = chunk[name].astype(dtype)
+    return chunk
+
+
+def _cursor_chunks(conn, query, params, names, chunksize):
+    # a named cursor keeps the result on the server; fetchmany pulls one chunk per round trip
+    with conn.cursor(name=f'extract_{uuid.uuid4().hex[:12]}') as cursor:
+        cursor.itersize = chunksize
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            yield pd.DataFrame(rows, columns=names)
+
+
+def _copy_chunks(conn, query, params, names, text_columns, chunksize):
+    # COPY writes into a pipe from a helper thread while read_csv parses the other end
+    with conn.cursor() as cursor:
+        sql = cursor.mogrify(query, params).decode()
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def produce():
+        with os.fdopen(write_fd, 'wb') as sink, conn.cursor() as cursor:
+            try:
+                cursor.copy_expert(f'COPY ({sql}) TO STDOUT WITH (FORMAT csv)', sink)
+            except Exception as e:
+                errors.append(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        with os.fdopen(read_fd, 'rb') as source:
+            yield from pd.read_csv(source, names=names, header=None, chunksize=chunksize,
+                                   dtype={name: 'str' for name in text_columns})
+    finally:
+        producer.join()
+    if errors:
+        raise errors[0]
+
+
+def iter_table(conn, table, start=None, end=None, method='copy', chunksize=CHUNK_ROWS):
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
+    query, params = table_query(table, start, end)
+    columns = TABLES[table][2]
+    names = [name for name, _, _ in columns]
+    if method == 'copy':
+        text_columns = [name for name, _, dtype in columns if dtype == 'str']
+        chunks = _copy_chunks(conn, query, params, names, text_columns, chunksize)
+    else:
+        chunks = _cursor_chunks(conn, query, params, names, chunksize)
+    for chunk in chunks:
+        yield conform(chunk, table)
+
+
+def read_table(conn, table, start=None, end=None, method='copy', chunksize=CHUNK_ROWS):
+    chunks = list(iter_table(conn, table, start, end, method, chunksize))
+    if not chunks:
+        return pd.DataFrame(columns=[name for name, _, _ in TABLES[table][2]])
+    return pd.concat(chunks, ignore_index=True)
+
+
+def read_tables(config=DB_CONFIG, start=None, end=None, method='copy', chunksize=CHUNK_ROWS):
+    # df_products, df_stores, df_customers, df_transactions, read from one snapshot
+    conn = connect(config)
+    try:
+        conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        return tuple(read_table(conn, table, start, end, method, chunksize) for table in TABLES)
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stream the warehouse tables out of PostgreSQL')
+    parser.add_argument('--start', help='first transaction date to include (YYYY-MM-DD)')
+    parser.add_argument('--end', help='first transaction date to leave out (YYYY-MM-DD)')
+    parser.add_argument('--method', default='copy', choices=METHODS)
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--export', metavar='DIR', help='write the tables as CSVs with the raw file names')
+    args = parser.parse_args()
+
+    conn = connect()
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    if args.export:
+        os.makedirs(args.export, exist_ok=True)
+    for table in TABLES:
+        started = time.perf_counter()
+        rows, chunks = 0, 0
+        for i, chunk in enumerate(iter_table(conn, table, args.start, args.end, args.method, args.chunksize)):
+            if args.export:
+                chunk.to_csv(os.path.join(args.export, f'{table}.csv'), mode='w' if i == 0 else 'a',
+                             header=i == 0, index=False)
+            rows += len(chunk)
+            chunks += 1
+        seconds = time.perf_counter() - started
+        print(f"✓ {TABLES[table][0]}: {rows:,} rows in {chunks} chunk(s), {seconds:.2f}s")
+    conn.rollback()
+    conn.close()
@@ -1,5 +1,5 @@
 SELECT * FROM public.fact_sales
-ORDER BY transaction_id ASC LIMIT 100
+ORDER BY transaction_id ASC LIMIT 100;
 
 -- RETAIL ANALYTICS 
 -- Database: retail_analytics
@@ -0,0 +1,114 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+# Batch "customers also bought" recommendations: item-item cosine similarity
+# from a sparse customer x product matrix, then every customer scored as
+# X @ S in row chunks, spread over worker processes.
+
+# The scores of a chunk are dense (chunk rows x items); chunks are sized so that
+# the ones being scored at the same time stay within this many bytes.
+MEMORY_BUDGET = 512 * 2**20
+# per score: the float32 score, its negated copy and argpartition's int64 index
+BYTES_PER_SCORE = 16
+
+def purchase_matrix(df, customer_col='customer_id', item_col='product_id', binary=True):
+    customer_codes, customers = pd.factorize(df[customer_col], sort=True)
+    item_codes, items = pd.factorize(df[item_col], sort=True)
+    values = np.ones(len(df), dtype=np.float32) if binary else df['quantity'].to_numpy(dtype=np.float32)
+    X = sparse.csr_matrix((values, (customer_codes, item_codes)),
+                          shape=(len(customers), len(items)))
+    if binary:
+        X.data[:] = 1
+    return X, pd.Index(customers, name=customer_col), pd.Index(items, name=item_col)
+
+
+def item_similarity(X, shrinkage=0.0):
+    co_counts = (X.T @ X).tocsr().astype(np.float32)
+    norms = np.sqrt(co_counts.diagonal())
+    inv = np.divide(1.0, norms + shrinkage, out=np.zeros_like(norms), where=norms > 0)
+    S = sparse.diags(inv) @ co_counts @ sparse.diags(inv)
+    S.setdiag(0)
+    S.eliminate_zeros()
+    return S.tocsr()
+
+
+def _top_n(X, S, start, stop, n, exclude_purchased):
+    rows = X[start:stop]
+    scores = rows @ S
+    if sparse.issparse(scores):
+        scores = scores.toarray()
+    if exclude_purchased:
+        r, c = rows.nonzero()
+        scores[r, c] = -np.inf
+    n = min(n, scores.shape[1])
+    top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return start, np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+# worker processes receive the matrices once through the initializer
+_worker_state = {}
+
+
+def _init_worker(X, S):
+    _worker_state['X'] = X
+    _worker_state['S'] = S
+
+
+def _worker_top_n(args):
+    return _top_n(_worker_state['X'], _worker_state['S'], *args)
+
+
+def recommend_all(X, S, customers, items, n=10, exclude_purchased=True, chunk_size=None, n_jobs=None,
+                  memory_budget=MEMORY_BUDGET):
+    if min(X.shape[0], X.shape[1], n) <= 0:
+        # no customers, no items or n == 0: nothing to rank (argpartition needs n >= 1)
+        return pd.DataFrame({customers.name: customers.to_numpy()[:0], 'rank': np.empty(0, dtype=np.int64),
+                             items.name: items.to_numpy()[:0], 'score': np.empty(0, dtype=np.float32)})
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, memory_budget // (n_jobs * X.shape[1] * BYTES_PER_SCORE))
+    chunks = [(start, min(start + chunk_size, X.shape[0]), n, exclude_purchased)
+              for start in range(0, X.shape[0], chunk_size)]
+    # co-purchase similarity is usually dense enough that a dense S is much faster to multiply
+    if sparse.issparse(S) and S.nnz > 0.1 * S.shape[0] * S.shape[1]:
+        S = S.toarray()
+
+    if n_jobs == 1 or len(chunks) == 1:
+        results = [_top_n(X, S, *chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(X, S)) as pool:
+            results = list(pool.map(_worker_top_n, chunks))
+
+    results.sort(key=lambda result: result[0])
+    top = np.vstack([result[1] for result in results])
+    top_scores = np.vstack([result[2] for result in results])
+    n = top.shape[1]
+
+    recs = pd.DataFrame({
+        customers.name: np.repeat(customers.to_numpy(), n),
+        'rank': np.tile(np.arange(1, n + 1), len(customers)),
+        items.name: items.to_numpy()[top.ravel()],
+        'score': top_scores.ravel(),
+    })
+    # customers who already bought everything similar get no filler rows
+    return recs[np.isfinite(recs['score']) & (recs['score'] > 0)].reset_index(drop=True)
+
+
+def customers_also_bought(df_transactions, n=10, n_jobs=None):
+    X, customers, items = purchase_matrix(df_transactions)
+    S = item_similarity(X)
+    return recommend_all(X, S, customers, items, n=n, n_jobs=n_jobs)
+
+
+if __name__ == '__main__':
+    df_transactions = pd.read_csv('transactions.csv')
+    recs = customers_also_bought(df_transactions)
+    recs.to_csv('customer_recommendations.csv', index=False)
+    print(f"✓ Saved: customer_recommendations.csv ({recs['customer_id'].nunique()} customers)")
@@ -0,0 +1,124 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+# Fingerprint-based render cache. A figure is re-rendered only when the hash of
+# its aggregated inputs, its builder code (with the repo helpers it calls) or
+# the style settings changes, or when the output file is missing. Fingerprints and the last render time of
+# each figure are kept in a small JSON manifest next to the PNGs.
+MANIFEST = '.render_cache.json'
+
+
+def _code_names(code):
+    # global names a code object reads, nested lambdas and comprehensions included
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+
+def _is_local(value, root):
+    module = sys.modules.get(getattr(value, '__module__', None) or '')
+    path = getattr(module, '__file__', None)
+    return path is not None and os.path.dirname(os.path.abspath(path)) == root
+
+
+def code_closure(func):
+    # source of func and of every function or class from the same directory it reaches through
+    # global names, plus the plain constants those read, so editing a helper module such as
+    # plot_binning changes the key; installed packages are keyed by their version instead
+    root = os.path.dirname(os.path.abspath(inspect.getfile(func)))
+    parts, seen, todo = [], set(), [func]
+    while todo:
+        value = todo.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        parts.append(inspect.getsource(value))
+        if inspect.isclass(value):
+            functions = [item for item in vars(value).values() if inspect.isfunction(item)]
+        else:
+            functions = [value]
+        for function in functions:
+            for name in sorted(_code_names(function.__code__)):
+                target = function.__globals__.get(name)
+                if (inspect.isfunction(target) or inspect.isclass(target)) and _is_local(target, root):
+                    todo.append(target)
+                elif isinstance(target, (bool, int, float, str, tuple, list, dict)):
+                    parts.append(f'{name} = {target!r}')
+    return '\n'.join(parts)
+
+
+def _update(digest, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(repr(type(value).__name__).encode())
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr(list(value.columns)).encode())
+            digest.update(repr(list(value.dtypes.astype(str))).encode())
+        else:
+            digest.update(repr((value.name, str(value.dtype))).encode())
+        digest.update(repr(value.index.names).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            digest.update(repr(key).encode())
+            _update(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _update(digest, item)
+    elif callable(value):
+        digest.update(code_closure(value).encode())
+    else:
+        digest.update(repr(value).encode())
+
+
+def fingerprint(*values):
+    digest = hashlib.sha256()
+    for value in values:
+        _update(digest, value)
+    return digest.hexdigest()
+
+
+class RenderCache:
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST)
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        self.hits = []
+        self.misses = []
+
+    def is_fresh(self, filename, key, force=False):
+        # a forced render counts as a miss
+        entry = self.entries.get(filename)
+        fresh = (not force and entry is not None and entry['fingerprint'] == key
+                 and os.path.exists(os.path.join(self.output_dir, filename)))
+        (self.hits if fresh else self.misses).append(filename)
+        return fresh
+
+    def record(self, filename, key, seconds):
+        self.entries[filename] = {'fingerprint': key, 'render_seconds': round(seconds, 3)}
+
+    def time_saved(self):
+        return sum(self.entries[filename]['render_seconds'] for filename in self.hits)
+
+    def save(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+    def summary(self):
+        return (f"Render cache: {len(self.hits)} hits, {len(self.misses)} misses, "
+                f"~{self.time_saved():.1f}s saved")
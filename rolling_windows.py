@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+
+# Rolling revenue / profit / margin for every series at once. Daily totals are
+# laid out as a dense (series x calendar day) array, and each window sum is
+# the difference of two columns of its running cumulative sum. Days with no
+# sales are real zeros, so the windows are calendar windows, not row windows.
+WINDOWS = (7, 28, 90)
+
+
+class RollingWindows:
+    def __init__(self, by='store_id', windows=WINDOWS):
+        self.by = by
+        self.windows = tuple(windows)
+        self.keys = pd.Index([], name=by)
+        self.start = None
+        self.revenue = np.zeros((0, 0))
+        self.profit = np.zeros((0, 0))
+        # cumulative sums with a leading zero column: cum[:, d + 1] = sum of days 0..d
+        self._cum_revenue = np.zeros((0, 1))
+        self._cum_profit = np.zeros((0, 1))
+
+    @classmethod
+    def build(cls, df, by='store_id', windows=WINDOWS):
+        return cls(by, windows).append(df)
+
+    @property
+    def n_days(self):
+        return self.revenue.shape[1]
+
+    def append(self, df):
+        # df needs transaction_date, total_amount, profit and the series column
+        dates = pd.to_datetime(df['transaction_date']).dt.normalize()
+        if self.start is None:
+            self.start = dates.min()
+        # earlier-than-start days would shift every column; only forward growth is supported
+        if dates.min() < self.start:
+            raise ValueError("RollingWindows can only append days on or after its start date")
+
+        keys = self.keys.union(pd.Index(df[self.by].unique(), name=self.by)).sort_values()
+        days = (dates - self.start).dt.days.to_numpy()
+        n_days = max(self.n_days, days.max() + 1)
+        self._grow(keys, n_days)
+
+        codes = self.keys.get_indexer(df[self.by].to_numpy())
+        flat = codes * n_days + days
+        size = len(self.keys) * n_days
+        self.revenue += np.bincount(flat, df['total_amount'].to_numpy(dtype=float), size).reshape(-1, n_days)
+        self.profit += np.bincount(flat, df['profit'].to_numpy(dtype=float), size).reshape(-1, n_days)
+
+        # only the cumulative sums from the earliest touched day onwards change
+        first = days.min()
+        self._cum_revenue[:, first + 1:] = self._cum_revenue[:, [first]] + np.cumsum(self.revenue[:, first:], axis=1)
+        self._cum_profit[:, first + 1:] = self._cum_profit[:, [first]] + np.cumsum(self.profit[:, first:], axis=1)
+        return self
+
+    def _grow(self, keys, n_days):
+        if keys.equals(self.keys) and n_days == self.n_days:
+            return
+        rows = keys.get_indexer(self.keys)
+
+        def grown(old, width, offset=0):
+            new = np.zeros((len(keys), width))
+            new[rows, :old.shape[1]] = old
+            if offset and old.shape[1] < width:
+                # cumulative sums carry their last value over the new days
+                new[rows, old.shape[1]:] = old[:, -1:]
+            return new
+
+        self.revenue = grown(self.revenue, n_days)
+        self.profit = grown(self.profit, n_days)
+        self._cum_revenue = grown(self._cum_revenue, n_days + 1, offset=1)
+        self._cum_profit = grown(self._cum_profit, n_days + 1, offset=1)
+        self.keys = keys
+
+    def window_sums(self, window):
+        end = np.arange(1, self.n_days + 1)
+        begin = np.clip(end - window, 0, None)
+        return (self._cum_revenue[:, end] - self._cum_revenue[:, begin],
+                self._cum_profit[:, end] - self._cum_profit[:, begin])
+
+    def to_frame(self):
+        dates = self.start + pd.to_timedelta(np.arange(self.n_days), unit='D')
+        frame = pd.DataFrame({
+            self.by: np.repeat(self.keys.to_numpy(), self.n_days),
+            'date': np.tile(dates, len(self.keys)),
+        })
+        for window in self.windows:
+            revenue, profit = self.window_sums(window)
+            frame[f'revenue_{window}d'] = revenue.ravel()
+            frame[f'profit_{window}d'] = profit.ravel()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                frame[f'margin_{window}d'] = np.where(revenue > 0, profit / revenue * 100, np.nan).ravel()
+        return frame
+
+
+def rolling_metrics(df_master, windows=WINDOWS):
+    return {by: RollingWindows.build(df_master, by, windows).to_frame()
+            for by in ['store_id', 'category']}
+
+
+if __name__ == '__main__':
+    df_master = pd.read_csv('master_dataset.csv', parse_dates=['transaction_date'])
+    for by, frame in rolling_metrics(df_master).items():
+        frame.to_csv(f'rolling_{by}.csv', index=False)
+        print(f"✓ Saved: rolling_{by}.csv ({frame[by].nunique()} series, {len(frame)} rows)")
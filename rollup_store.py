@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Hierarchical time rollups of revenue, profit and transaction count per
+# store and category. Only the daily level is computed from raw rows; weekly
+# and monthly come from daily, quarterly from monthly and yearly from
+# quarterly. Appending new days folds their aggregates into every level.
+LEVELS = ['daily', 'weekly', 'monthly', 'quarterly', 'yearly']
+KEYS = ['period', 'store_id', 'category']
+MEASURES = ['total_amount', 'profit', 'transaction_count']
+
+SEASONS = np.array(['Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                    'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter'])
+
+
+def _period_start(dates, level):
+    dates = pd.DatetimeIndex(dates)
+    if level == 'daily':
+        return dates.normalize()
+    if level == 'weekly':
+        return dates.normalize() - pd.to_timedelta(dates.dayofweek, unit='D')
+    if level == 'monthly':
+        return dates.to_period('M').to_timestamp()
+    if level == 'quarterly':
+        return dates.to_period('Q').to_timestamp()
+    if level == 'yearly':
+        return dates.to_period('Y').to_timestamp()
+    raise ValueError(f"Unknown rollup level: {level}")
+
+
+# each level and the finer level it is derived from
+PARENT = {'weekly': 'daily', 'monthly': 'daily', 'quarterly': 'monthly', 'yearly': 'quarterly'}
+
+
+class TimeRollupStore:
+    def __init__(self):
+        empty = pd.DataFrame(columns=MEASURES,
+                             index=pd.MultiIndex.from_arrays([[], [], []], names=KEYS))
+        self.levels = {level: empty.astype(float) for level in LEVELS}
+
+    @classmethod
+    def build(cls, df):
+        return cls().append(df)
+
+    def _regroup(self, frame, level):
+        periods = _period_start(frame.index.get_level_values('period'), level)
+        return frame.groupby([periods, frame.index.get_level_values('store_id'),
+                              frame.index.get_level_values('category')]).sum().rename_axis(KEYS)
+
+    def append(self, df):
+        # df needs transaction_date, store_id, category, total_amount and profit (e.g. df_master)
+        raw = pd.DataFrame({
+            'period': _period_start(df['transaction_date'], 'daily'),
+            'store_id': df['store_id'].to_numpy(),
+            'category': df['category'].to_numpy(),
+            'total_amount': df['total_amount'].to_numpy(),
+            'profit': df['profit'].to_numpy(),
+            'transaction_count': 1,
+        })
+        deltas = {'daily': raw.groupby(KEYS).sum()}
+        for level in LEVELS[1:]:
+            deltas[level] = self._regroup(deltas[PARENT[level]], level)
+        for level in LEVELS:
+            self.levels[level] = self.levels[level].add(deltas[level], fill_value=0)
+        return self
+
+    def series(self, level='monthly', by=None):
+        by = [by] if isinstance(by, str) else list(by or [])
+        frame = self.levels[level]
+        result = frame.groupby(['period'] + by).sum()
+        result['transaction_count'] = result['transaction_count'].astype('int64')
+        return result
+
+    def calendar(self, attribute):
+        # day-of-week / month-name / season profiles from the daily level
+        daily = self.levels['daily']
+        dates = pd.DatetimeIndex(daily.index.get_level_values('period'))
+        if attribute == 'day_name':
+            keys = dates.day_name()
+        elif attribute == 'month_name':
+            keys = dates.month_name()
+        elif attribute == 'season':
+            keys = SEASONS[dates.month - 1]
+        elif attribute == 'year':
+            keys = dates.year
+        else:
+            raise ValueError(f"Unknown calendar attribute: {attribute}")
+        result = daily.groupby(np.asarray(keys)).sum()
+        result.index.name = attribute
+        result['transaction_count'] = result['transaction_count'].astype('int64')
+        return result
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for level, frame in self.levels.items():
+            frame.to_csv(os.path.join(directory, f'{level}_rollup.csv'))
+
+    @classmethod
+    def load(cls, directory):
+        store = cls()
+        for level in LEVELS:
+            path = os.path.join(directory, f'{level}_rollup.csv')
+            if os.path.exists(path):
+                store.levels[level] = pd.read_csv(path, parse_dates=['period'], index_col=KEYS)
+        return store
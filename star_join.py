@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+
+# A dimension table indexed by its integer ID. When the IDs are dense (the
+# generator numbers products, stores and customers from 1) the index is a plain
+# position array, so resolving fact keys is a single gather instead of a hash join.
+class DimensionIndex:
+    def __init__(self, df, key, columns, max_dense_ratio=4):
+        self.key = key
+        self.columns = list(columns)
+        # the columns' own arrays (ExtensionArrays included), so gathers never round-trip through object arrays
+        self.values = {col: df[col].array for col in self.columns}
+
+        ids = df[key].to_numpy()
+        self.dense = (np.issubdtype(ids.dtype, np.integer) and len(ids) > 0 and ids.min() >= 0
+                      and ids.max() < max(len(ids), 1) * max_dense_ratio)
+        if self.dense:
+            self.lookup = np.full(ids.max() + 1, -1, dtype=np.int64)
+            self.lookup[ids] = np.arange(len(ids))
+        else:
+            self.lookup = pd.Index(ids)
+
+    def positions(self, keys):
+        keys = np.asarray(keys)
+        if not self.dense:
+            return self.lookup.get_indexer(keys)
+        # NaN keys never match
+        int_keys = np.where(pd.notna(keys), keys, -1).astype(np.int64)
+        in_range = (int_keys >= 0) & (int_keys < len(self.lookup))
+        pos = np.full(len(keys), -1, dtype=np.int64)
+        pos[in_range] = self.lookup[int_keys[in_range]]
+        return pos
+
+    def gather(self, column, positions):
+        # -1 positions (unmatched keys) become NaN, like a left merge
+        return self.values[column].take(positions, allow_fill=True)
+
+
+# Star schema over a fact frame. Dimension attributes are gathered on demand
+# (lazy view) or all at once into a single enriched frame.
+class StarSchema:
+    def __init__(self, fact):
+        self.fact = fact
+        self.dimensions = []
+        self._positions = {}
+
+    def add_dimension(self, df, key, columns):
+        self.dimensions.append(DimensionIndex(df, key, columns))
+        return self
+
+    def _dimension_for(self, column):
+        for dim in self.dimensions:
+            if column in dim.columns:
+                return dim
+        return None
+
+    def _positions_for(self, dim):
+        if dim.key not in self._positions:
+            self._positions[dim.key] = dim.positions(self.fact[dim.key].to_numpy())
+        return self._positions[dim.key]
+
+    @property
+    def columns(self):
+        return list(self.fact.columns) + [col for dim in self.dimensions for col in dim.columns]
+
+    def __getitem__(self, column):
+        if column in self.fact.columns:
+            return self.fact[column]
+        dim = self._dimension_for(column)
+        if dim is None:
+            raise KeyError(column)
+        return pd.Series(dim.gather(column, self._positions_for(dim)), index=self.fact.index, name=column)
+
+    def unmatched(self):
+        return {dim.key: int((self._positions_for(dim) < 0).sum()) for dim in self.dimensions}
+
+    def materialize(self, columns=None):
+        columns = columns or self.columns
+        data = {}
+        for col in columns:
+            if col in self.fact.columns:
+                data[col] = self.fact[col].array
+            else:
+                dim = self._dimension_for(col)
+                if dim is None:
+                    raise KeyError(col)
+                data[col] = dim.gather(col, self._positions_for(dim))
+        # the result frame is built once from the arrays; the fact columns are copied once, not once per join
+        return pd.DataFrame(data, index=self.fact.index)
+
+
+def build_master(df_transactions, df_products, df_stores, df_customers, lazy=False):
+    star = (StarSchema(df_transactions)
+            .add_dimension(df_products, 'product_id', ['product_name', 'category', 'margin_category'])
+            .add_dimension(df_stores, 'store_id', ['store_name', 'region', 'city'])
+            .add_dimension(df_customers, 'customer_id', ['customer_segment', 'lifetime_value']))
+    if lazy:
+        return star
+    return star.materialize()
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+
+# Business rules are declared once with the helpers below and run together by
+# RuleEngine over each chunk. Every check is a vectorized mask over the chunk;
+# a True entry marks a violating row.
+class Rule:
+    def __init__(self, name, columns, check, description=''):
+        self.name = name
+        self.columns = columns
+        self.check = check
+        self.description = description
+
+
+def not_null(column):
+    return Rule(f'{column}_not_null', [column],
+                lambda chunk: chunk[column].isnull().to_numpy(),
+                f'{column} is missing')
+
+
+def in_range(column, min_value=None, max_value=None, name=None):
+    def check(chunk):
+        values = chunk[column].to_numpy(dtype=float)
+        mask = np.zeros(len(values), dtype=bool)
+        if min_value is not None:
+            mask |= values < min_value
+        if max_value is not None:
+            mask |= values > max_value
+        return mask
+
+    return Rule(name or f'{column}_in_range', [column], check,
+                f'{column} outside [{min_value}, {max_value}]')
+
+
+def non_negative(column):
+    return in_range(column, min_value=0, name=f'{column}_non_negative')
+
+
+# arithmetic identity, e.g. identity('profit', 'total_amount - total_cost')
+def identity(column, expression, tolerance=0.01, name=None):
+    def check(chunk):
+        expected = chunk.eval(expression).to_numpy(dtype=float)
+        return np.abs(chunk[column].to_numpy(dtype=float) - expected) > tolerance
+
+    return Rule(name or f'{column}_identity', [column], check,
+                f'{column} != {expression} (tolerance {tolerance})')
+
+
+# foreign-key membership against a dimension's IDs via binary search on the sorted keys
+def foreign_key(column, valid_ids, name=None):
+    keys = np.unique(np.asarray(valid_ids))
+
+    def check(chunk):
+        values = chunk[column].to_numpy()
+        if len(keys) == 0:
+            return np.ones(len(values), dtype=bool)
+        pos = np.searchsorted(keys, values).clip(max=len(keys) - 1)
+        return keys[pos] != values
+
+    return Rule(name or f'{column}_fk', [column], check,
+                f'{column} not found in dimension ({len(keys)} keys)')
+
+
+class RuleEngine:
+    def __init__(self, rules, id_column='transaction_id', sample_size=5):
+        self.rules = list(rules)
+        self.id_column = id_column
+        self.sample_size = sample_size
+        self.reset()
+
+    def reset(self):
+        self.rows = 0
+        self.violations = {rule.name: 0 for rule in self.rules}
+        self.samples = {rule.name: [] for rule in self.rules}
+
+    def validate(self, chunk):
+        self.rows += len(chunk)
+        ids = chunk[self.id_column].to_numpy() if self.id_column in chunk else chunk.index.to_numpy()
+        for rule in self.rules:
+            mask = rule.check(chunk)
+            count = int(mask.sum())
+            if count == 0:
+                continue
+            self.violations[rule.name] += count
+            missing = self.sample_size - len(self.samples[rule.name])
+            if missing > 0:
+                self.samples[rule.name].extend(ids[mask][:missing].tolist())
+        return self
+
+    def validate_chunks(self, chunks):
+        for chunk in chunks:
+            self.validate(chunk)
+        return self.results()
+
+    def results(self):
+        return pd.DataFrame({
+            'rule': [rule.name for rule in self.rules],
+            'description': [rule.description for rule in self.rules],
+            'violations': [self.violations[rule.name] for rule in self.rules],
+            'sample_ids': [self.samples[rule.name] for rule in self.rules],
+        })
+
+
+def transaction_rules(df_products=None, df_stores=None, df_customers=None):
+    critical_cols = ['transaction_id', 'transaction_date', 'product_id',
+                     'store_id', 'customer_id', 'total_amount']
+    rules = [not_null(col) for col in critical_cols]
+    rules += [non_negative(col) for col in ['quantity', 'total_amount', 'profit']]
+    rules.append(in_range('discount_pct', 0, 100))
+    rules.append(identity('profit', 'total_amount - total_cost', tolerance=0.01))
+    if df_products is not None:
+        rules.append(foreign_key('product_id', df_products['product_id']))
+    if df_stores is not None:
+        rules.append(foreign_key('store_id', df_stores['store_id']))
+    if df_customers is not None:
+        rules.append(foreign_key('customer_id', df_customers['customer_id']))
+    return rules
@@ -0,0 +1,185 @@
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# Date-clustered block storage for the master dataset. Rows are grouped by
+# month and, within a month, sorted by store and date, then written in blocks
+# of up to BLOCK_ROWS rows (small months share one, large ones are split); a
+# zone map keeps the min/max of transaction_date and store_id for every block,
+# so a scan such as "store 7, Nov-Dec 2024" only opens the blocks whose ranges
+# can contain matching rows. Date filters skip the other months, and once a
+# month spans several blocks each covers only a few stores, so store filters
+# skip the rest.
+# Product ids are spread over every block in this layout, so they get no zone
+# map (a product filter is still applied to the rows that are read).
+STORE_DIR = 'master_blocks'
+ZONE_MAP = 'zone_map.json'
+BLOCK_ROWS = 10_000
+BUCKET = 'M'
+SORT_KEY = ['store_id', 'transaction_date', 'transaction_id']
+ZONE_COLUMNS = ['transaction_date', 'store_id']
+
+
+class ZonedTable:
+    def __init__(self, directory, zones, columns, date_columns, block_rows=BLOCK_ROWS):
+        self.directory = directory
+        # one row per block: file, rows and <column>_min / <column>_max for the zone columns
+        self.zones = zones
+        self.columns = columns
+        self.date_columns = date_columns
+        self.block_rows = block_rows
+        self.last_scan = None
+
+    @classmethod
+    def write(cls, df, directory=STORE_DIR, block_rows=BLOCK_ROWS):
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, 'block_*.csv')):
+            os.remove(path)
+
+        date_columns = [col for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])]
+        if 'transaction_date' in date_columns:
+            buckets = df['transaction_date'].dt.to_period(BUCKET).astype('int64').to_numpy()
+        else:
+            buckets = np.zeros(len(df), dtype=np.int64)
+        order = np.lexsort([df[col].to_numpy() for col in reversed(SORT_KEY) if col in df.columns] + [buckets])
+        df, buckets = df.iloc[order], buckets[order]
+        # blocks of up to block_rows rows: whole buckets share a block while they fit, a bucket
+        # that does not fit starts a new one (and is split when it is larger than a block)
+        bounds = np.flatnonzero(np.diff(buckets)) + 1
+        starts, open_rows = [], block_rows
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(df)]):
+            if open_rows + (hi - lo) > block_rows:
+                starts.extend(range(lo, hi, block_rows))
+                open_rows = (hi - lo - 1) % block_rows + 1
+            else:
+                open_rows += hi - lo
+        ends = starts[1:] + [len(df)]
+
+        zone_columns = [f'{col}_{end}' for col in ZONE_COLUMNS if col in df.columns for end in ('min', 'max')]
+        zones = []
+        for number, (start, end) in enumerate(zip(starts, ends)):
+            block = df.iloc[start:end]
+            filename = f'block_{number:05d}.csv'
+            block.to_csv(os.path.join(directory, filename), index=False)
+            zone = {'file': filename, 'rows': len(block)}
+            for col in ZONE_COLUMNS:
+                if col in block.columns:
+                    zone[f'{col}_min'] = block[col].min()
+                    zone[f'{col}_max'] = block[col].max()
+            zones.append(zone)
+
+        zones = pd.DataFrame(zones, columns=['file', 'rows'] + zone_columns)
+        table = cls(directory, zones, list(df.columns), date_columns, block_rows)
+        table.save()
+        return table
+
+    def save(self):
+        records = self.zones.copy()
+        for col in self.date_columns:
+            for end in ('min', 'max'):
+                if f'{col}_{end}' in records.columns:
+                    records[f'{col}_{end}'] = records[f'{col}_{end}'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        with open(os.path.join(self.directory, ZONE_MAP), 'w') as f:
+            json.dump({'block_rows': self.block_rows, 'bucket': BUCKET, 'sort_key': SORT_KEY, 'columns': self.columns,
+                       'date_columns': self.date_columns,
+                       'blocks': json.loads(records.to_json(orient='records'))}, f, indent=2)
+
+    @classmethod
+    def open(cls, directory=STORE_DIR):
+        with open(os.path.join(directory, ZONE_MAP)) as f:
+            meta = json.load(f)
+        zones = pd.DataFrame(meta['blocks'])
+        for col in meta['date_columns']:
+            for end in ('min', 'max'):
+                if f'{col}_{end}' in zones.columns:
+                    zones[f'{col}_{end}'] = pd.to_datetime(zones[f'{col}_{end}'])
+        return cls(directory, zones, meta['columns'], meta['date_columns'], meta['block_rows'])
+
+    def prune(self, start=None, end=None, **equals):
+        # blocks that may hold rows with start <= transaction_date < end and col in values;
+        # a column without a zone map prunes nothing
+        keep = np.ones(len(self.zones), dtype=bool)
+        if start is not None:
+            keep &= (self.zones['transaction_date_max'] >= pd.Timestamp(start)).to_numpy()
+        if end is not None:
+            keep &= (self.zones['transaction_date_min'] < pd.Timestamp(end)).to_numpy()
+        for col, values in equals.items():
+            if f'{col}_min' not in self.zones.columns:
+                continue
+            values = np.atleast_1d(values)
+            lows = self.zones[f'{col}_min'].to_numpy()[:, None]
+            highs = self.zones[f'{col}_max'].to_numpy()[:, None]
+            keep &= ((lows <= values) & (values <= highs)).any(axis=1)
+        return self.zones[keep]
+
+    def scan(self, start=None, end=None, columns=None, **equals):
+        # read only the surviving blocks, then apply the exact row filter
+        blocks = self.prune(start, end, **equals)
+        usecols = None
+        if columns is not None:
+            dated = start is not None or end is not None
+            usecols = list(dict.fromkeys(list(columns) + (['transaction_date'] if dated else []) + list(equals)))
+        parse_dates = [col for col in self.date_columns if usecols is None or col in usecols]
+        frames = [pd.read_csv(os.path.join(self.directory, filename), usecols=usecols, parse_dates=parse_dates)
+                  for filename in blocks['file']]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=usecols or self.columns)
+
+        rows_read = len(df)
+        if len(df):
+            mask = np.ones(len(df), dtype=bool)
+            if start is not None:
+                mask &= (df['transaction_date'] >= pd.Timestamp(start)).to_numpy()
+            if end is not None:
+                mask &= (df['transaction_date'] < pd.Timestamp(end)).to_numpy()
+            for col, values in equals.items():
+                mask &= df[col].isin(np.atleast_1d(values)).to_numpy()
+            df = df[mask].reset_index(drop=True)
+        if columns is not None:
+            df = df[list(columns)]
+
+        self.last_scan = {'blocks_read': len(blocks), 'blocks_total': len(self.zones), 'rows_read': rows_read,
+                          'rows_total': int(self.zones['rows'].sum()), 'rows_matched': len(df)}
+        return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build or query the month/store-clustered master dataset blocks')
+    parser.add_argument('--build', action='store_true', help='(re)write the blocks from master_dataset.csv')
+    parser.add_argument('--source', default='master_dataset.csv')
+    parser.add_argument('--directory', default=STORE_DIR)
+    parser.add_argument('--block-rows', type=int, default=BLOCK_ROWS)
+    parser.add_argument('--start', help='first transaction date to include (YYYY-MM-DD)')
+    parser.add_argument('--end', help='first transaction date to leave out (YYYY-MM-DD)')
+    parser.add_argument('--store-id', type=int, nargs='*')
+    parser.add_argument('--product-id', type=int, nargs='*')
+    parser.add_argument('--by', default='category', help='column to summarise the matching rows by')
+    args = parser.parse_args()
+
+    if args.build:
+        started = time.perf_counter()
+        master = pd.read_csv(args.source, parse_dates=['transaction_date'])
+        table = ZonedTable.write(master, args.directory, args.block_rows)
+        print(f"✓ Wrote {len(table.zones)} blocks of up to {args.block_rows:,} rows to {args.directory}/ "
+              f"({time.perf_counter() - started:.2f}s)")
+    table = ZonedTable.open(args.directory)
+
+    equals = {}
+    if args.store_id:
+        equals['store_id'] = args.store_id
+    if args.product_id:
+        equals['product_id'] = args.product_id
+    started = time.perf_counter()
+    rows = table.scan(args.start, args.end, **equals)
+    scan = table.last_scan
+    print(f"✓ Read {scan['blocks_read']}/{scan['blocks_total']} blocks, {scan['rows_read']:,}/{scan['rows_total']:,} rows"
+          f" -> {scan['rows_matched']:,} matching ({time.perf_counter() - started:.2f}s)")
+    if len(rows):
+        summary = rows.groupby(args.by).agg(revenue=('total_amount', 'sum'), profit=('profit', 'sum'),
+                                            transactions=('transaction_id', 'count'))
+        print(summary.sort_values('revenue', ascending=False).round(2))